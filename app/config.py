@@ -11,4 +11,76 @@ class Config:
 
     MQTT_BROKER = os.getenv("MQTT_BROKER")
     MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
-    AUDIO_PATH = os.getenv("AUDIO_PATH", "./local/audio")
\ No newline at end of file
+    AUDIO_PATH = os.getenv("AUDIO_PATH", "./local/audio")
+    # Session audio archive: <AUDIO_PATH>/<SR_ID>/seg-NNNNN.pcm + index.bin
+    AUDIO_SEGMENT_MB = int(os.getenv("AUDIO_SEGMENT_MB", 16))
+    AUDIO_WRITE_BUFFER_KB = int(os.getenv("AUDIO_WRITE_BUFFER_KB", 256))
+
+    # Speech-to-text engine: "torch" (openai-whisper, float32) or
+    # "ctranslate2" (faster-whisper; STT_COMPUTE_TYPE e.g. int8 on CPU).
+    # STT_CPU_THREADS=0 keeps the library default.
+    STT_BACKEND = os.getenv("STT_BACKEND", "torch")
+    STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "small")
+    STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8")
+    STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", 0))
+
+    # Streaming decode: rolling audio window + transcript tail as prompt
+    STT_STREAM_WINDOW_S = float(os.getenv("STT_STREAM_WINDOW_S", 12))
+    STT_PROMPT_WORDS = int(os.getenv("STT_PROMPT_WORDS", 30))
+
+    # Energy VAD gate in front of Whisper
+    VAD_THRESHOLD_DBFS = float(os.getenv("VAD_THRESHOLD_DBFS", -45))
+    VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", 10))
+    VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", 300))
+    VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", 200))
+
+    # Write-behind transcript: service_chunks rows are flushed every
+    # N chunks or S seconds, service_records.text checkpointed every S
+    TRANSCRIPT_FLUSH_CHUNKS = int(os.getenv("TRANSCRIPT_FLUSH_CHUNKS", 5))
+    TRANSCRIPT_FLUSH_S = float(os.getenv("TRANSCRIPT_FLUSH_S", 15))
+    TRANSCRIPT_CHECKPOINT_S = float(os.getenv("TRANSCRIPT_CHECKPOINT_S", 60))
+
+    # Speech-to-text worker threads. They only overlap inside the model
+    # (torch / CTranslate2 release the GIL); decoding, VAD and DB work are
+    # GIL-bound, so more workers than cores does not help.
+    STT_WORKERS = int(os.getenv("STT_WORKERS", 2))
+
+    # Cross-workstation batched inference (batch size <= 1 disables it).
+    # Each worker has at most one chunk in flight, so keep
+    # STT_WORKERS >= STT_BATCH_SIZE to actually fill batches.
+    # Batched decoding runs without the transcript-tail prompt (one prompt
+    # per forward pass would give one-item batches): throughput over some
+    # accuracy at chunk boundaries. Keep 1 to decode with prompts.
+    STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", 1))
+    STT_BATCH_WAIT_MS = int(os.getenv("STT_BATCH_WAIT_MS", 150))
+
+    # IDs reserved per id_sequences round-trip (see id_allocator)
+    ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", 50))
+
+    # SOP definitions cache (seconds before reloading sop_services/steps)
+    SOP_CACHE_TTL_S = float(os.getenv("SOP_CACHE_TTL_S", 300))
+
+    # Socket.IO events per workstation are merged within this window
+    EMIT_DEBOUNCE_MS = int(os.getenv("EMIT_DEBOUNCE_MS", 100))
+
+    # Control-command publisher (persistent MQTT connection, see stream_controller)
+    MQTT_PUBLISH_RETRIES = int(os.getenv("MQTT_PUBLISH_RETRIES", 3))
+    MQTT_PUBLISH_QUEUE = int(os.getenv("MQTT_PUBLISH_QUEUE", 1000))
+
+    # MQTT dispatch: bounded queues per RP, applied when an RP's queue is
+    # full ("drop_oldest", "drop_newest" or "coalesce"). Audio chunks that
+    # waited longer than AUDIO_LATE_MS are reported as late. KWS start/end
+    # events share the RP's audio queue (so they stay ordered with its
+    # chunks) and are never dropped or coalesced, whatever the policy;
+    # the control queue only carries the other KWS events.
+    AUDIO_QUEUE_PER_RP = int(os.getenv("AUDIO_QUEUE_PER_RP", 20))
+    AUDIO_OVERLOAD_POLICY = os.getenv("AUDIO_OVERLOAD_POLICY", "drop_oldest")
+    AUDIO_LATE_MS = int(os.getenv("AUDIO_LATE_MS", 5000))
+    CONTROL_QUEUE_PER_RP = int(os.getenv("CONTROL_QUEUE_PER_RP", 10))
+    CONTROL_OVERLOAD_POLICY = os.getenv("CONTROL_OVERLOAD_POLICY", "coalesce")
+
+    # Supervisor floor view: full reload from the DB every N seconds
+    FLOOR_STATE_TTL_S = float(os.getenv("FLOOR_STATE_TTL_S", 300))
+
+    # Sessions per page on /cs/my-history and the staff detail view
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 25))
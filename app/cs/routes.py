@@ -1,20 +1,22 @@
 # app/cs/routes.py
 
 import os
-from flask import Blueprint, render_template
+from flask import Blueprint, jsonify, render_template, request
 from flask_login import current_user, login_required
+from flask_socketio import emit, join_room
 
+from app.config import Config
 from app.extensions import db
 from app.models.workstation import Workstation
 from app.models.service_record import ServiceRecord
-from app.models.sop_service import SOPService
-from app.models.sop_step import SOPStep
-from app.models.service_checklist import ServiceChecklist
 from app.extensions import socketio
 from app.services import session_manager
 from app.services.stream_controller import publish_end_stream
+from app.services.payload_builder import build_session_payload
+from app.services.sop_engine import sop_catalog
+from app.services.session_emitter import session_emitter, rp_room
+from app.services.session_history import history_page, history_summary, session_transcript
 from app.utils.decorators import role_required
-from app.utils.scoring import calculate_session_score
 from app.services.session_manager import attach_user_to_active_session
 from flask_login import current_user
 
@@ -41,46 +43,12 @@ def dashboard():
 
     # 4. Sekarang aman, karena 'workstation' sudah dikenal (meskipun isinya None)
     if workstation:
-        active_session = (
-            db.session.query(ServiceRecord)
-            .filter(
-                ServiceRecord.workstation_id == workstation.workstation_id,
-                ServiceRecord.end_time.is_(None)
-            )
-            .order_by(ServiceRecord.start_time.desc())
-            .first()
-        )
+        active_session = session_manager.active_record_query(workstation.workstation_id).first()
         
         # 5. Jika ada session, siapkan payload-nya
         if active_session:
-            # Query checklist dari database
-            db_checklist = (
-                db.session.query(SOPStep, ServiceChecklist)
-                .outerjoin(
-                    ServiceChecklist,
-                    (ServiceChecklist.step_id == SOPStep.step_id) &
-                    (ServiceChecklist.service_record_id == active_session.service_record_id)
-                )
-                .filter(SOPStep.service_id == active_session.service_id)
-                .order_by(SOPStep.step_number)
-                .all()
-            )
-
-            checklist = [
-                {
-                    "step_id": step.step_id,
-                    "description": step.step_description,
-                    "checked": sc.is_checked if sc else False
-                }
-                for step, sc in db_checklist
-            ]
-
-            initial_payload = {
-                "session_id": active_session.service_record_id,
-                "service": active_session.service_detected,
-                "confidence": active_session.confidence or 0,
-                "sop": checklist,
-            }
+            # Checklist rows dari database, langkah SOP dari cache
+            initial_payload = build_session_payload(active_session.service_record_id)
             
     if active_session and not active_session.user_id:
         attach_user_to_active_session(
@@ -102,12 +70,8 @@ def dashboard():
 @login_required
 @role_required(["Customer Service"])
 def service_guidelines():
-    services = db.session.query(SOPService).all()
-    steps = (
-        db.session.query(SOPStep)
-        .order_by(SOPStep.step_number.asc())
-        .all()
-    )
+    services = sop_catalog.services()
+    steps = sop_catalog.all_steps()
 
     return render_template(
         "cs/service-guidelines.html",
@@ -123,54 +87,53 @@ def service_guidelines():
 @login_required
 @role_required(["Customer Service"])
 def my_history():
-    history = (
-        db.session.query(ServiceRecord)
-        .filter_by(user_id=current_user.user_id)
-        .order_by(ServiceRecord.start_time.desc())
-        .all()
+    # Keyset page (?before=<cursor>): cost does not grow with history length
+    cursor = request.args.get("before")
+    history, next_cursor = history_page(
+        current_user.user_id,
+        cursor=cursor,
+        limit=Config.HISTORY_PAGE_SIZE
     )
+    summary = history_summary(current_user.user_id)
 
-    total_sessions = len(history)
-    final_performance_score = 0
-    avg_duration = 0
-    fastest_service = None
-
-    if total_sessions > 0:
-        total_weighted_score = 0
-        valid_durations = []
-
-        for record in history:
-            # 🔹 GUNAKAN FUNGSI DARI UTILS
-            # Jika utils Anda butuh object record utuh:
-            record.session_score = calculate_session_score(record) 
-            
-            # Catatan: Jika fungsi di utils Anda hanya menerima (is_normal, reason), 
-            # maka kodenya tetap record.session_score = calculate_session_score(record.is_normal_flow, record.reason)
-            # tapi fungsi yang dipanggil sudah berasal dari utils (global).
+    return render_template(
+        "cs/my-history.html",
+        history=history,
+        cursor=cursor,
+        next_cursor=next_cursor,
+        completed_sessions=summary["completed_sessions"],
+        open_sessions=summary["open_sessions"],
+        final_performance_score=summary["avg_score"],
+        avg_duration=summary["avg_duration"],
+        fastest_service=summary["fastest_service"],
+        latest_service=summary["latest_service"]
+    )
 
-            total_weighted_score += record.session_score
 
-            if record.duration and record.duration > 0:
-                valid_durations.append(record.duration)
+@cs_bp.route("/my-history/<service_record_id>/transcript")
+@login_required
+@role_required(["Customer Service"])
+def history_transcript(service_record_id):
+    text = session_transcript(service_record_id, user_id=current_user.user_id)
+    if text is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify({"service_record_id": service_record_id, "text": text})
+
+@socketio.on("join_workstation")
+def handle_join_workstation(data):
+    # Session events are only sent to the workstation's room
+    rp_id = (data or {}).get("rp_id")
+    pc_id = os.getenv("PC_ID")
+    if not rp_id:
+        return
 
-        final_performance_score = round(total_weighted_score / total_sessions, 1)
+    ws = db.session.query(Workstation).filter_by(pc_id=pc_id, rpi_id=rp_id).first()
+    if not ws:
+        print(f"[SOCKET] join rejected rp={rp_id} pc={pc_id}")
+        return
 
-        if valid_durations:
-            avg_duration = int(sum(valid_durations) / len(valid_durations))
-            fastest_service = min(
-                [r for r in history if r.duration and r.duration > 0],
-                key=lambda x: x.duration,
-                default=None
-            )
+    join_room(rp_room(rp_id))
 
-    return render_template(
-        "cs/my-history.html",
-        history=history,
-        total_sessions=total_sessions,
-        final_performance_score=final_performance_score,
-        avg_duration=avg_duration,
-        fastest_service=fastest_service
-    )
 
 @socketio.on("session_end")
 def handle_manual_end(data):
@@ -180,7 +143,7 @@ def handle_manual_end(data):
 
     ws = db.session.query(Workstation).filter_by(pc_id=pc_id, rpi_id=rp_id).first()
     if not ws:
-        socketio.emit(
+        emit(
             "session_end_rejected",
             {"message": "Invalid RP for this PC", "rp_id": rp_id}
         )
@@ -189,7 +152,7 @@ def handle_manual_end(data):
     # Get active session for this RP
     sr_id = session_manager.get_active_session_by_rp(rp_id)
     if not sr_id:
-        socketio.emit(
+        emit(
             "session_end_rejected",
             {"message": "No active session", "rp_id": rp_id}
         )
@@ -209,14 +172,15 @@ def handle_manual_end(data):
     )
 
     if not sr_id:
-        socketio.emit(
+        emit(
             "session_end_rejected",
             {"message": "Session cannot be ended", "rp_id": rp_id}
         )
         return
 
     publish_end_stream(rp_id)
-    socketio.emit(
+    session_emitter.emit(
         "session_ended",
-        {"session_id": sr_id, "reason": reason, "rp_id": rp_id}
+        {"session_id": sr_id, "reason": reason},
+        rp_id
     )
\ No newline at end of file
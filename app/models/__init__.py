@@ -6,3 +6,5 @@ from .sop_service import SOPService
 from .sop_step import SOPStep
 from .service_checklist import ServiceChecklist
 from .service_chunk import ServiceChunk
+from .id_sequence import IdSequence
+from .daily_compliance import DailyCompliance
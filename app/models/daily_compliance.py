@@ -0,0 +1,22 @@
+from app.extensions import db
+
+
+class DailyCompliance(db.Model):
+    """
+    Rollup of finished sessions per (day, workstation, user, service).
+    Maintained by finalize_session; rebuilt with `python -m scripts.rollup`.
+    """
+    __tablename__ = "daily_compliance"
+
+    # Date of start_time; '' when the session had no user / service
+    day = db.Column(db.Date, primary_key=True)
+    workstation_id = db.Column(db.String(10), primary_key=True)
+    user_id = db.Column(db.String(10), primary_key=True, default="")
+    service_id = db.Column(db.String(50), primary_key=True, default="")
+
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    normal_flow = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    # Only sessions with duration > 0 (as in the staff averages)
+    duration_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    duration_count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,9 @@
+from app.extensions import db
+
+
+class IdSequence(db.Model):
+    __tablename__ = "id_sequences"
+
+    # Two-letter ID prefix (SR, CU, CE, ...)
+    name = db.Column(db.String(2), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=1)
@@ -4,7 +4,7 @@ from app.extensions import db
 class ServiceRecord(db.Model):
     __tablename__ = "service_records"
 
-    service_record_id = db.Column(db.String(6), primary_key=True)
+    service_record_id = db.Column(db.String(12), primary_key=True)
     workstation_id = db.Column(db.String(10), nullable=False)
     user_id = db.Column(db.String(10), nullable=True)
 
@@ -20,10 +20,3 @@ class ServiceRecord(db.Model):
     audio_path = db.Column(db.String(255), nullable=True)
     is_normal_flow = db.Column(db.Boolean, default=True)
     reason = db.Column(db.String(255))
-
-    @staticmethod
-    def generate_id(last_id):
-        if not last_id:
-            return "SR0001"
-        num = int(last_id[2:]) + 1
-        return f"SR{num:04d}"
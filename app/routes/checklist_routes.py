@@ -1,27 +1,22 @@
 # app/routes/checklist_routes.py
 
 from datetime import datetime, timezone
+from sqlalchemy import insert
 from app.extensions import socketio, db
 from app.services.session_manager import get_active_session_by_rp
 from app.models.service_checklist import ServiceChecklist
 from app.models.service_record import ServiceRecord
-from app.services.sop_engine import load_sop_by_service_id
+from app.services.sop_engine import load_sop_by_service_id, sop_catalog
+from app.services.id_allocator import allocate_ids, CHECKLIST_PREFIX
+from app.services.session_registry import session_registry
+from app.services.session_emitter import session_emitter
 import logging
-from app.models.sop_step import SOPStep
 from app.models.workstation import Workstation
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def generate_checklist_id(last_id=None):
-    """Generate incremental checklist_id like CE0001, CE0002, ..."""
-    if not last_id:
-        return "CE0001"
-    num = int(last_id[2:]) + 1
-    return f"CE{num:04d}"
-
-
 @socketio.on('checklist_update')
 def handle_checklist_update(data):
     """
@@ -52,17 +47,11 @@ def handle_checklist_update(data):
         service_record = db.session.query(ServiceRecord).filter_by(service_record_id=sr_id).first()
 
     # 2. Ensure checklist exists
-    sc = db.session.query(ServiceChecklist).filter_by(
-        service_record_id=service_record.service_record_id,
-        step_id=step_id
-    ).first()
+    sc = checklist_step_query(service_record.service_record_id, step_id).first()
     if not sc:
         logger.info(f"[DB] Checklist missing for SR={service_record.service_record_id}, initializing...")
         initialize_checklist(service_record.service_record_id, getattr(service_record, "service_id", None))
-        sc = db.session.query(ServiceChecklist).filter_by(
-            service_record_id=service_record.service_record_id,
-            step_id=step_id
-        ).first()
+        sc = checklist_step_query(service_record.service_record_id, step_id).first()
         if not sc:
             logger.error(f"[DB] Failed to initialize checklist for step_id={step_id}")
             return
@@ -73,89 +62,139 @@ def handle_checklist_update(data):
     db.session.commit()
     logger.info(f"[DB] Step updated in DB: {step_id}, checked={checked}")
 
-    # 4. Emit updated checklist to frontend
-    emit_checklist(service_record.service_record_id)
+    # 4. Emit only the changed step to frontend
+    emit_checklist_steps(service_record.service_record_id, [sc])
+
+
+def checklist_step_query(service_record_id, step_id):
+    # idx_checklists_record_step
+    return db.session.query(ServiceChecklist).filter_by(
+        service_record_id=service_record_id,
+        step_id=step_id
+    )
 
 
 def initialize_checklist(service_record_id, service_id):
     """
     Initialize the SOP checklist for a service record.
-    Commits to DB and emits to frontend.
+    One bulk INSERT, then emits the rows just written (no re-read).
     """
-    sop = load_sop_by_service_id(service_id)
-    if not sop:
-        logger.warning(f"[INIT] SOP not found for service_id={service_id}")
+    rows = build_checklist_rows(service_record_id, service_id)
+    if not rows:
         return
 
-    checklist = []
+    db.session.execute(insert(ServiceChecklist), rows)
+    db.session.commit()
+    logger.info(f"[INIT] Checklist initialized for SR={service_record_id}")
+
+    # Emit initial checklist to frontend
+    emit_checklist(service_record_id, rows)
 
-    # Get last checklist_id from DB
-    last = db.session.query(ServiceChecklist).order_by(ServiceChecklist.checklist_id.desc()).first()
-    last_id = last.checklist_id if last else None
 
-    for step in sop["steps"]:
-        sc_id = generate_checklist_id(last_id)
-        last_id = sc_id  # next iteration
+def build_checklist_rows(service_record_id, service_id):
+    """
+    Unchecked checklist rows (dicts for a bulk INSERT) for the service's
+    SOP steps; [] if the SOP is unknown.
+    """
+    sop = load_sop_by_service_id(service_id)
+    if not sop:
+        logger.warning(f"[INIT] SOP not found for service_id={service_id}")
+        return []
 
-        sc = ServiceChecklist(
-            checklist_id=sc_id,
-            service_record_id=service_record_id,
-            step_id=step["step_id"],
-            is_checked=False
-        )
-        db.session.add(sc)
+    # Allocate all checklist_ids up front
+    checklist_ids = allocate_ids(CHECKLIST_PREFIX, len(sop["steps"]))
 
-        checklist.append({
+    return [
+        {
+            "checklist_id": sc_id,
+            "service_record_id": service_record_id,
             "step_id": step["step_id"],
-            "description": step.get("step_description", ""),
-            "checked": False,
+            "is_checked": False,
             "checked_at": None
-        })
-
-    db.session.commit()
-    logger.info(f"[INIT] Checklist initialized for SR={service_record_id}")
-
-    # Emit initial checklist to frontend
-    emit_checklist(service_record_id)
+        }
+        for sc_id, step in zip(checklist_ids, sop["steps"])
+    ]
 
 
-def emit_checklist(service_record_id):
+def emit_checklist(service_record_id, rows=None):
     """
-    Fetch checklist from DB and emit via SocketIO.
+    Emit the checklist via SocketIO.
+
+    `rows` (dicts with step_id / is_checked / checked_at) can be passed
+    by callers that just wrote them; otherwise they are read from the DB.
     """
-    service_record = db.session.query(ServiceRecord).filter_by(service_record_id=service_record_id).first()
+    service_record = db.session.get(ServiceRecord, service_record_id)
     if not service_record:
         return
 
-    # Fetch related workstation to get RP ID
-    ws = db.session.query(Workstation).filter_by(workstation_id=service_record.workstation_id).first()
-    rp_id = ws.rpi_id if ws else None
-
-    rows = (
-        db.session.query(ServiceChecklist, SOPStep)
-        .join(SOPStep, SOPStep.step_id == ServiceChecklist.step_id)
-        .filter(ServiceChecklist.service_record_id == service_record_id)
-        .order_by(SOPStep.step_number)
-        .all()
+    # RP ID from the active-session registry, DB only as fallback
+    rp_id = _record_rp_id(service_record_id)
+
+    if rows is None:
+        rows = [
+            row._asdict()
+            for row in (
+                db.session.query(
+                    ServiceChecklist.step_id,
+                    ServiceChecklist.is_checked,
+                    ServiceChecklist.checked_at
+                )
+                .filter(ServiceChecklist.service_record_id == service_record_id)
+                .all()
+            )
+        ]
+
+    # Steps come from the SOP cache
+    steps = [(row, sop_catalog.step(row["step_id"])) for row in rows]
+    steps = sorted(
+        ((row, step) for row, step in steps if step),
+        key=lambda item: item[1].step_number
     )
 
     sop_payload = [
         {
-            "step_id": sc.step_id,
+            "step_id": row["step_id"],
             "description": step.step_description,
-            "checked": sc.is_checked,
-            "checked_at": sc.checked_at.strftime("%Y-%m-%d %H:%M") if sc.checked_at else None
+            "checked": row["is_checked"],
+            "checked_at": row["checked_at"].strftime("%Y-%m-%d %H:%M") if row["checked_at"] else None
         }
-        for sc, step in rows
+        for row, step in steps
     ]
 
-    socketio.emit(
+    session_emitter.emit(
         "sop_update",
         {
             "session_id": service_record.service_record_id,
             "service": getattr(service_record, "service_detected", None),
             "confidence": getattr(service_record, "confidence", None),
-            "sop": sop_payload,
-            "rp_id": rp_id
-        }
+            "sop": sop_payload
+        },
+        rp_id
     )
+
+
+def _record_rp_id(service_record_id):
+    active = session_registry.find_record(service_record_id)
+    if active:
+        return active.rp_id
+
+    service_record = db.session.get(ServiceRecord, service_record_id)
+    if not service_record:
+        return None
+    ws = db.session.get(Workstation, service_record.workstation_id)
+    return ws.rpi_id if ws else None
+
+
+def emit_checklist_steps(service_record_id, checklist_rows):
+    """
+    Emit changed checklist rows as a `sop_patch` diff.
+    """
+    steps = [
+        {
+            "step_id": sc.step_id,
+            "checked": sc.is_checked,
+            "checked_at": sc.checked_at.strftime("%Y-%m-%d %H:%M") if sc.checked_at else None
+        }
+        for sc in checklist_rows
+    ]
+    session_emitter.emit_steps(service_record_id, _record_rp_id(service_record_id), steps)
@@ -0,0 +1,271 @@
+# app/services/audio_archive.py
+
+import json
+import mmap
+import os
+import threading
+
+import numpy as np
+
+from app.config import Config
+
+INDEX_FILE = "index.bin"
+META_FILE = "meta.json"
+
+# One fixed-size record per archived chunk (little-endian):
+# chunk_number | segment | byte offset in segment | first sample | samples
+INDEX_DTYPE = np.dtype([
+    ("chunk_number", "<u4"),
+    ("segment", "<u4"),
+    ("offset", "<u8"),
+    ("start_sample", "<u8"),
+    ("n_samples", "<u4"),
+])
+
+
+def _segment_name(segment: int) -> str:
+    return f"seg-{segment:05d}.pcm"
+
+
+# =====================================
+# WRITER
+# =====================================
+class SessionArchive:
+    """
+    Append-only int16 mono PCM archive of one session.
+
+    Audio goes to `<AUDIO_PATH>/<SR_ID>/seg-NNNNN.pcm` files (a new
+    segment every `segment_bytes`) through buffered sequential writes;
+    index.bin gets one INDEX_DTYPE record per chunk so time ranges and
+    chunks can be located without reading the audio. Samples are counted
+    in arrival order.
+
+    Reopening an existing directory (process restart mid-session) continues
+    after the last indexed chunk; a closed archive cannot be reopened.
+    """
+
+    def __init__(self, path: str, segment_bytes: int, buffer_bytes: int):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.buffer_bytes = buffer_bytes
+
+        self.sample_rate = None
+        self.segment = 0
+        self.segment_offset = 0
+        self.total_samples = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._restore()
+        self._index = open(os.path.join(path, INDEX_FILE), "ab", buffering=64 * 1024)
+        self._data = self._open_segment()
+
+    def _restore(self):
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            return
+
+        meta = load_meta(self.path)
+        if meta.get("finished"):
+            raise RuntimeError(f"Audio archive {self.path} is already closed")
+        self.sample_rate = meta.get("sample_rate")
+
+        index_path = os.path.join(self.path, INDEX_FILE)
+        index = load_index(self.path).copy()
+
+        # Drop records whose audio never reached the disk (crash between
+        # the buffered writes); they would point past the segment end
+        n = len(index)
+        while n:
+            last = index[n - 1]
+            seg_path = os.path.join(self.path, _segment_name(int(last["segment"])))
+            size = os.path.getsize(seg_path) if os.path.exists(seg_path) else 0
+            if int(last["offset"]) + int(last["n_samples"]) * 2 <= size:
+                break
+            n -= 1
+
+        # Also cuts a partially written trailing record
+        if os.path.exists(index_path) and os.path.getsize(index_path) != n * INDEX_DTYPE.itemsize:
+            with open(index_path, "r+b") as f:
+                f.truncate(n * INDEX_DTYPE.itemsize)
+
+        if n:
+            last = index[n - 1]
+            self.segment = int(last["segment"])
+            self.total_samples = int(last["start_sample"]) + int(last["n_samples"])
+            seg_path = os.path.join(self.path, _segment_name(self.segment))
+            self.segment_offset = os.path.getsize(seg_path)
+
+        print(
+            f"[ARCHIVE] reopened {self.path}: {n} chunk(s), "
+            f"segment={self.segment} offset={self.segment_offset}"
+        )
+
+    def _open_segment(self):
+        return open(
+            os.path.join(self.path, _segment_name(self.segment)),
+            "ab",
+            buffering=self.buffer_bytes
+        )
+
+    def _write_meta(self, finished=False):
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump({
+                "sample_rate": self.sample_rate,
+                "format": "pcm_s16le",
+                "finished": finished
+            }, f)
+
+    def append(self, chunk_number: int, pcm, sample_rate: int):
+        with self.lock:
+            if self.sample_rate is None:
+                self.sample_rate = sample_rate
+                self._write_meta()
+            elif sample_rate != self.sample_rate:
+                print(f"[ARCHIVE] skip chunk={chunk_number}: {sample_rate}Hz != {self.sample_rate}Hz")
+                return
+
+            data = np.ascontiguousarray(pcm, dtype=np.int16)
+            if not len(data):
+                return
+
+            # Chunks never span segments
+            if self.segment_offset and self.segment_offset + data.nbytes > self.segment_bytes:
+                self._data.close()
+                self.segment += 1
+                self.segment_offset = 0
+                self._data = self._open_segment()
+
+            record = np.array(
+                [(chunk_number, self.segment, self.segment_offset, self.total_samples, len(data))],
+                dtype=INDEX_DTYPE
+            )
+            self._data.write(data.data)
+            self._index.write(record.tobytes())
+
+            self.segment_offset += data.nbytes
+            self.total_samples += len(data)
+
+    def close(self):
+        with self.lock:
+            self._data.close()
+            self._index.close()
+            self._write_meta(finished=True)
+
+
+# =====================================
+# READER
+# =====================================
+def load_index(path: str) -> np.ndarray:
+    """
+    The chunk index, memory-mapped (read-only view, no copy).
+    """
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path) or os.path.getsize(index_path) == 0:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+
+    with open(index_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    n = len(mm) // INDEX_DTYPE.itemsize
+    return np.frombuffer(mm, dtype=INDEX_DTYPE, count=n)
+
+
+def load_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+
+def _read_samples(path: str, index: np.ndarray, first: int, last: int) -> np.ndarray:
+    if last <= first:
+        return np.zeros(0, dtype=np.int16)
+
+    starts = index["start_sample"]
+    lo = max(0, int(np.searchsorted(starts, first, side="right")) - 1)
+    hi = int(np.searchsorted(starts, last, side="left"))
+
+    parts = []
+    maps = {}
+    try:
+        for rec in index[lo:hi]:
+            seg = int(rec["segment"])
+            if seg not in maps:
+                with open(os.path.join(path, _segment_name(seg)), "rb") as f:
+                    maps[seg] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            a = max(first - int(rec["start_sample"]), 0)
+            b = min(last - int(rec["start_sample"]), int(rec["n_samples"]))
+            # Copy out only the requested samples; no view may outlive the map
+            parts.append(np.frombuffer(
+                maps[seg],
+                dtype=np.int16,
+                count=b - a,
+                offset=int(rec["offset"]) + a * 2
+            ).copy())
+    finally:
+        for mm in maps.values():
+            mm.close()
+
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+
+
+def read_range(path: str, start_s: float = 0.0, end_s: float = None):
+    """
+    Returns (int16 PCM, sample_rate) for [start_s, end_s) of a finalized
+    session. Only the segments covering the range are mapped.
+    """
+    sample_rate = load_meta(path)["sample_rate"]
+    index = load_index(path)
+    if len(index) == 0:
+        return np.zeros(0, dtype=np.int16), sample_rate
+
+    total = int(index["start_sample"][-1] + index["n_samples"][-1])
+    first = max(0, int(start_s * sample_rate))
+    last = total if end_s is None else min(total, int(end_s * sample_rate))
+    return _read_samples(path, index, first, last), sample_rate
+
+
+def read_chunk(path: str, chunk_number: int):
+    """
+    Returns (int16 PCM, sample_rate) of one archived chunk, or None.
+    """
+    index = load_index(path)
+    hits = np.flatnonzero(index["chunk_number"] == chunk_number)
+    if len(hits) == 0:
+        return None
+
+    rec = index[hits[-1]]
+    start = int(rec["start_sample"])
+    pcm = _read_samples(path, index, start, start + int(rec["n_samples"]))
+    return pcm, load_meta(path)["sample_rate"]
+
+
+# =====================================
+# PER-SESSION REGISTRY
+# =====================================
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_session_archive(service_record_id: str) -> SessionArchive:
+    with _archives_lock:
+        archive = _archives.get(service_record_id)
+        if archive is None:
+            archive = SessionArchive(
+                os.path.join(Config.AUDIO_PATH, service_record_id),
+                segment_bytes=Config.AUDIO_SEGMENT_MB * 1024 * 1024,
+                buffer_bytes=Config.AUDIO_WRITE_BUFFER_KB * 1024
+            )
+            _archives[service_record_id] = archive
+        return archive
+
+
+def close_session_archive(service_record_id: str):
+    """
+    Flush and close the session's archive; returns its path (or None).
+    """
+    with _archives_lock:
+        archive = _archives.pop(service_record_id, None)
+    if archive is None:
+        return None
+    archive.close()
+    return archive.path
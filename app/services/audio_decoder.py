@@ -0,0 +1,136 @@
+# app/services/audio_decoder.py
+
+import io
+import struct
+import threading
+
+import numpy as np
+import soundfile as sf
+
+# Opus packets in one chunk are length-prefixed: u16 (LE) size + packet
+OPUS_PACKET_LEN = struct.Struct("<H")
+# Longest Opus frame is 120 ms
+OPUS_MAX_FRAME_MS = 120
+
+
+# =====================================
+# DECODERS
+# =====================================
+class AudioDecoder:
+    """
+    Turns one AudioChunk into (int16 mono PCM, sample_rate).
+
+    One instance per session, so codecs that carry state between chunks
+    (Opus) keep it for the whole stream.
+    """
+
+    format = None
+
+    def decode(self, chunk):
+        raise NotImplementedError
+
+
+class PCMDecoder(AudioDecoder):
+    format = "pcm_s16le"
+
+    def decode(self, chunk):
+        if len(chunk.data) % 2:
+            raise ValueError("odd PCM byte count")
+        # Zero-copy view over the received bytes
+        return np.frombuffer(chunk.data, dtype=np.int16), chunk.sample_rate
+
+
+class FlacDecoder(AudioDecoder):
+    """
+    Each chunk is a complete FLAC stream (libsndfile via soundfile);
+    FLAC frames do not depend on earlier chunks.
+    """
+
+    format = "flac"
+
+    def decode(self, chunk):
+        pcm, sample_rate = sf.read(io.BytesIO(chunk.data), dtype="int16", always_2d=True)
+        if pcm.shape[1] > 1:
+            pcm = pcm.mean(axis=1).astype(np.int16)
+        else:
+            pcm = pcm[:, 0]
+        return pcm, sample_rate
+
+
+class OpusDecoder(AudioDecoder):
+    """
+    Raw Opus packets, decoded by one long-lived libopus decoder per
+    session (Opus predicts from the previous packets). Requires the
+    optional 'opuslib' package.
+    """
+
+    format = "opus"
+
+    def __init__(self, sample_rate=16000):
+        try:
+            import opuslib
+        except ImportError as e:
+            raise RuntimeError("Opus audio requires the 'opuslib' package") from e
+
+        self.sample_rate = sample_rate
+        self.max_frame = sample_rate * OPUS_MAX_FRAME_MS // 1000
+        self._decoder = opuslib.Decoder(sample_rate, 1)
+        self._error = opuslib.OpusError
+
+    def decode(self, chunk):
+        data = chunk.data
+        frames = []
+        offset = 0
+
+        while offset + OPUS_PACKET_LEN.size <= len(data):
+            (size,) = OPUS_PACKET_LEN.unpack_from(data, offset)
+            offset += OPUS_PACKET_LEN.size
+            if offset + size > len(data):
+                raise ValueError("truncated Opus packet")
+
+            packet = bytes(data[offset:offset + size])
+            offset += size
+            try:
+                frames.append(self._decoder.decode(packet, self.max_frame))
+            except self._error as e:
+                raise ValueError(f"Opus decode failed: {e}") from e
+
+        # Always decoded at the session rate, whatever the encoder used
+        return np.frombuffer(b"".join(frames), dtype=np.int16), self.sample_rate
+
+
+DECODERS = {
+    PCMDecoder.format: PCMDecoder,
+    FlacDecoder.format: FlacDecoder,
+    OpusDecoder.format: OpusDecoder,
+}
+
+
+def create_decoder(fmt, sample_rate=16000) -> AudioDecoder:
+    if fmt not in DECODERS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    if fmt == OpusDecoder.format:
+        return OpusDecoder(sample_rate)
+    return DECODERS[fmt]()
+
+
+# =====================================
+# PER-SESSION REGISTRY
+# =====================================
+_decoders = {}
+_decoders_lock = threading.Lock()
+
+
+def get_session_decoder(service_record_id: str, fmt: str, sample_rate=16000) -> AudioDecoder:
+    with _decoders_lock:
+        decoder = _decoders.get(service_record_id)
+        if decoder is None or decoder.format != fmt:
+            decoder = create_decoder(fmt, sample_rate)
+            _decoders[service_record_id] = decoder
+        return decoder
+
+
+def pop_session_decoder(service_record_id: str):
+    with _decoders_lock:
+        return _decoders.pop(service_record_id, None)
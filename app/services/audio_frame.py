@@ -0,0 +1,114 @@
+# app/services/audio_frame.py
+
+import base64
+import json
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+# =====================================
+# BINARY FRAME (rp/<RP>/audio/stream)
+# =====================================
+# magic "SA" | version u8 | format u8 | chunk_number u32 | sample_rate u32
+# followed by the raw audio bytes, all little-endian
+FRAME_MAGIC = b"SA"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<2sBBII")
+
+FORMAT_CODES = {
+    1: "pcm_s16le",
+    2: "flac",
+    3: "opus",
+}
+FORMAT_IDS = {name: code for code, name in FORMAT_CODES.items()}
+
+# Anything outside this (e.g. 0) would break the VAD / resampler later
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+
+@dataclass
+class AudioChunk:
+    chunk_number: int
+    sample_rate: int
+    format: str
+    data: memoryview
+
+
+def encode_audio_frame(chunk_number: int, sample_rate: int, fmt: str, data: bytes) -> bytes:
+    """
+    Used by RP clients (and scripts/simulate_session.py).
+    """
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, FORMAT_IDS[fmt], chunk_number, sample_rate
+    )
+    return header + bytes(data)
+
+
+def _valid_sample_rate(sample_rate) -> bool:
+    if (
+        isinstance(sample_rate, int) and not isinstance(sample_rate, bool)
+        and MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE
+    ):
+        return True
+    print("[AUDIO] Invalid sample_rate:", sample_rate)
+    return False
+
+
+def _parse_binary(raw: bytes) -> Optional[AudioChunk]:
+    if len(raw) < FRAME_HEADER.size:
+        print("[AUDIO] Truncated frame header")
+        return None
+
+    _, version, fmt_code, chunk_number, sample_rate = FRAME_HEADER.unpack_from(raw)
+    if version != FRAME_VERSION:
+        print("[AUDIO] Unsupported frame version:", version)
+        return None
+
+    if not _valid_sample_rate(sample_rate):
+        return None
+
+    return AudioChunk(
+        chunk_number=chunk_number,
+        sample_rate=sample_rate,
+        format=FORMAT_CODES.get(fmt_code, f"unknown:{fmt_code}"),
+        # No copy: a view of the MQTT payload after the header
+        data=memoryview(raw)[FRAME_HEADER.size:]
+    )
+
+
+def _parse_json(raw: bytes) -> Optional[AudioChunk]:
+    # Compatibility path: {"chunk_number", "audio" (base64), "format", "sample_rate"}
+    try:
+        payload = json.loads(raw.decode())
+    except Exception as e:
+        print("[INGESTOR] Invalid JSON:", e)
+        return None
+
+    chunk_number = payload.get("chunk_number")
+    audio_b64 = payload.get("audio")
+
+    if not isinstance(chunk_number, int):
+        print("[AUDIO] Invalid chunk_number")
+        return None
+
+    if not audio_b64:
+        print("[AUDIO] Missing audio")
+        return None
+
+    sample_rate = payload.get("sample_rate", 16000)
+    if not _valid_sample_rate(sample_rate):
+        return None
+
+    return AudioChunk(
+        chunk_number=chunk_number,
+        sample_rate=sample_rate,
+        format=payload.get("format"),
+        data=memoryview(base64.b64decode(audio_b64))
+    )
+
+
+def parse_audio_message(raw: bytes) -> Optional[AudioChunk]:
+    if raw[:len(FRAME_MAGIC)] == FRAME_MAGIC:
+        return _parse_binary(raw)
+    return _parse_json(raw)
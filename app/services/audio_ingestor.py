@@ -1,26 +1,27 @@
-import base64
 import json
-import queue
-import tempfile
-import threading
-from datetime import datetime, timezone
 
 import paho.mqtt.client as mqtt
 
 from app.extensions import db
-from app.models.service_chunk import ServiceChunk
 from app.models.service_record import ServiceRecord
-from app.services.session_manager import get_active_session_by_rp
-from app.services.whisper_model import get_whisper_model
-from app.services.service_detector import detect_service, should_lock_service
-from app.services.sop_engine import load_sop_by_service_id
-from app.services.kws_event_handler import handle_kws_event
-from scripts.stt_whisper import transcribe_chunk
+from app.services.session_manager import get_active_session
+from app.services.session_registry import session_registry
+from app.services.service_detector import get_session_detector
+from app.services.kws_event_handler import handle_kws_event, START_EVENTS, END_EVENTS
+from app.services.session_store import append_transcript, release_late_session
+from app.services.streaming_transcriber import get_session_stream
+from app.services.vad import get_session_vad
+from app.services.transcription_pool import TranscriptionPool
+from app.services.batch_scheduler import BatchScheduler
+from app.services.stream_controller import publisher
+from app.services.floor_state import floor_state
+from app.services.rp_queue import RPQueue
+from app.services.audio_frame import AudioChunk, parse_audio_message
+from app.services.audio_decoder import get_session_decoder
+from app.services.audio_archive import get_session_archive
+from scripts.stt_whisper import transcribe_pcm
 import os
-import re
-
-import soundfile as sf
-import numpy as np
+import threading
 
 # =====================================
 # CONFIG
@@ -31,8 +32,11 @@ MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
 AUDIO_TOPIC = "rp/+/audio/stream"
 KWS_TOPIC = "rp/+/event/kws/+"
 
-audio_queue = queue.Queue()
-model = get_whisper_model()
+# Created by start_ingestor(); routes chunks to STT workers by rp_id
+transcription_pool = None
+batch_scheduler = None
+# KWS events other than start/end, handled off the MQTT network thread
+control_queue = None
 
 SERVICE_KEY_MAP = {
     "MBCA_REGISTRATION": "SV0003",
@@ -45,19 +49,20 @@ SERVICE_KEY_MAP = {
 # MQTT CALLBACK
 # =====================================
 def on_message(client, userdata, msg):
-    try:
-        payload = json.loads(msg.payload.decode())
-    except Exception as e:
-        print("[INGESTOR] Invalid JSON:", e)
-        return
-
+    """
+    Runs on the paho network thread: only route by topic and enqueue.
+    Decoding, DB work and emits happen in the control / STT workers.
+
+    Session start/end go through the RP's STT queue together with its
+    audio, so a start is always handled before the chunks that follow it
+    (and an end after the chunks before it).
+    """
     parts = msg.topic.split("/")
     if len(parts) < 4:
         print("[INGESTOR] Invalid topic:", msg.topic)
         return
 
     rp_id = parts[1].upper()
-    app = userdata["app"]
 
     if parts[2] == "event" and parts[3] == "kws":
         if len(parts) < 5:
@@ -65,195 +70,225 @@ def on_message(client, userdata, msg):
             return
 
         event_type = parts[4].lower()
-        payload["event"] = event_type 
+        if event_type in START_EVENTS or event_type in END_EVENTS:
+            # Never coalesced or dropped
+            transcription_pool.submit(rp_id, ("kws", (event_type, msg.payload)), essential=True)
+            return
 
-        with app.app_context():
-            handle_kws_event(rp_id, payload)
+        # Repeated events of one type for an RP collapse to the first while queued
+        control_queue.put(rp_id, (event_type, msg.payload), key=event_type)
         return
 
     if parts[2] == "audio" and parts[3] == "stream":
-        audio_queue.put((rp_id, payload))
+        transcription_pool.submit(rp_id, ("audio", msg.payload))
         return
-    
 
-# =====================================
-# AUDIO WORKER THREAD
-# =====================================
-def audio_worker(app):
-    with app.app_context():
-        while True:
-            rp_id, payload = audio_queue.get()
-            try:
-                process_audio_chunk(rp_id, payload)
-            except Exception as e:
-                print("[INGESTOR] processing error:", e)
-            finally:
-                audio_queue.task_done()
 
+def _decode_json(raw: bytes):
+    try:
+        return json.loads(raw.decode())
+    except Exception as e:
+        print("[INGESTOR] Invalid JSON:", e)
+        return None
 
-# =====================================
-# CORE AUDIO PROCESSOR
-# =====================================
-def process_audio_chunk(rp_id: str, payload: dict):
-    db.session.remove()
-    sr_id = get_active_session_by_rp(rp_id)
-    if not sr_id:
-        print(f"[AUDIO] No active session for rp={rp_id}")
+
+def _handle_kws(rp_id: str, event_type: str, raw: bytes):
+    payload = _decode_json(raw)
+    if payload is None:
         return
+    payload["event"] = event_type
 
-    chunk_number = payload.get("chunk_number")
-    audio_b64 = payload.get("audio")
+    try:
+        handle_kws_event(rp_id, payload)
+    except Exception as e:
+        print(f"[INGESTOR] KWS handling error rp={rp_id}:", e)
+    finally:
+        db.session.remove()
 
-    if not isinstance(chunk_number, int):
-        print("[AUDIO] Invalid chunk_number")
-        return
 
-    if not audio_b64:
-        print("[AUDIO] Missing audio")
+def _run_control(app):
+    while True:
+        rp_id, (event_type, raw), _ = control_queue.get()
+        with app.app_context():
+            _handle_kws(rp_id, event_type, raw)
+
+
+def handle_rp_message(rp_id: str, item, transcribe=transcribe_pcm):
+    """
+    STT worker handler: one ("audio", raw) or ("kws", (event_type, raw))
+    item of an RP, in arrival order.
+    """
+    kind, data = item
+    if kind == "kws":
+        _handle_kws(rp_id, *data)
         return
+    handle_audio_message(rp_id, data, transcribe=transcribe)
 
-    print(f"[AUDIO] queued SR={sr_id} rp={rp_id} chunk={chunk_number}")
 
-    # ---------------------------------
-    # Decode audio → temp mp3
-    # ---------------------------------
-    audio_bytes = base64.b64decode(audio_b64)
-    # with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-    #     tmp.write(audio_bytes)
-    #     tmp_path = tmp.name
-    # audio_b64 = payload.get("audio")
-    fmt = payload.get("format")
-    sr = payload.get("sample_rate", 16000)
-
-    if fmt != "pcm_s16le":
-        print("[AUDIO] Unsupported format:", fmt)
+def handle_audio_message(rp_id: str, raw: bytes, transcribe=transcribe_pcm):
+    # Binary frame, or the legacy base64-in-JSON payload
+    chunk = parse_audio_message(raw)
+    if chunk is None:
         return
+    process_audio_chunk(rp_id, chunk, transcribe=transcribe)
 
-    pcm = np.frombuffer(base64.b64decode(audio_b64), dtype=np.int16)
 
-    if len(pcm) < sr * 0.5:   # < 1 detik
+# =====================================
+# CORE AUDIO PROCESSOR
+# =====================================
+def process_audio_chunk(rp_id: str, chunk: AudioChunk, transcribe=transcribe_pcm):
+    db.session.remove()
+    active = get_active_session(rp_id)
+    if not active:
+        print(f"[AUDIO] No active session for rp={rp_id}")
         return
+    sr_id = active.service_record_id
+
+    print(f"[AUDIO] queued SR={sr_id} rp={rp_id} chunk={chunk.chunk_number}")
 
-    audio_float = pcm.astype(np.float32) / 32768.0
+    stream = _transcribe_chunk(sr_id, chunk, transcribe)
 
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        sf.write(tmp.name, audio_float, sr)
-        tmp_path = tmp.name
+    # The session may have been finalized while this chunk was decoding:
+    # never recreate its state, keep the text in the DB instead. Text the
+    # finalization already flushed from the stream is not claimed twice.
+    with session_registry.lock_for(sr_id):
+        text = normalize_whisper_text(stream.claim()) if stream else ""
 
+        if session_registry.is_finalized(sr_id):
+            print(f"[AUDIO] SR={sr_id} finalized during transcription chunk={chunk.chunk_number}")
+            release_late_session(sr_id, text)
+            return
+
+        if text:
+            _apply_text(rp_id, active, text)
+
+
+def _transcribe_chunk(sr_id: str, chunk: AudioChunk, transcribe):
+    """
+    Decode, archive, VAD-gate and stream-decode one chunk; returns the
+    session's stream holding the newly stable text (None if the chunk
+    never reached it).
+    """
     # ---------------------------------
-    # Speech-to-text
+    # Decode audio (PCM / FLAC / Opus, decoder state kept per session)
     # ---------------------------------
-    # result = model.transcribe(tmp_path, language="id", verbose=False)
-    # text = result.get("text", "").strip()
+    try:
+        decoder = get_session_decoder(sr_id, chunk.format, chunk.sample_rate)
+        pcm, sr = decoder.decode(chunk)
+    except (ValueError, RuntimeError) as e:
+        print(f"[AUDIO] Cannot decode {chunk.format} chunk={chunk.chunk_number}:", e)
+        return None
+
+    # Keep the full (un-gated) audio for replay / re-transcription
+    try:
+        get_session_archive(sr_id).append(chunk.chunk_number, pcm, sr)
+    except (OSError, RuntimeError) as e:
+        print(f"[ARCHIVE] write failed SR={sr_id}:", e)
+
+    # Voice activity gate: skip silence / noise before Whisper
+    pcm = get_session_vad(sr_id).process(pcm, sr)
+    if pcm is None:
+        return None
 
     # ---------------------------------
-    # Append to service_records.text
+    # Speech-to-text
     # ---------------------------------
-    record = db.session.get(ServiceRecord, sr_id)
-    if not record:
-        print(f"[AUDIO] ServiceRecord not found: {sr_id}")
-        return
-
-    text = transcribe_chunk(
-        tmp_path,
+    # Rolling-window decode: only newly stable text is committed
+    stream = get_session_stream(sr_id)
+    stream.feed(
+        pcm,
+        sr,
+        transcribe,
         language="id"
     )
 
-    text = normalize_whisper_text(text)
-    
-    if not text:
-        return
-    
-    service_already_locked = bool(record.service_id)
+    return stream
+
 
-    # Append transcript
-    record.text = f"{record.text} {text}" if record.text else text
-    db.session.commit()
+def _apply_text(rp_id: str, active, text: str):
+    sr_id = active.service_record_id
+    service_already_locked = active.locked
 
-    full_text = record.text
+    # Append transcript (buffered; chunks/text are written behind)
+    append_transcript(sr_id, text)
 
     # ---------------------------------
     # EARLY SERVICE DETECTION (ONE-SHOT)
     # ---------------------------------
     if not service_already_locked:
-        recent_text = " ".join(record.text.split()[-30:])
-        service_key, label, confidence, hits = detect_service(recent_text)
+        # Incremental: only the new tokens are scored
+        detection = get_session_detector(sr_id).feed(text)
 
-        if service_key and should_lock_service(service_key, confidence):
+        if detection:
+            service_key, label, confidence, hits = detection
             service_id = SERVICE_KEY_MAP.get(service_key)
-            if service_id:
+            record = db.session.get(ServiceRecord, sr_id)
+            if service_id and record:
                 record.service_id = service_id
                 record.service_detected = label
                 record.confidence = confidence
 
                 db.session.commit()
+                session_registry.mark_locked(sr_id, service_id)
 
                 print(
                     f"[SERVICE LOCKED] SR={sr_id} "
                     f"{label} conf={confidence}"
                 )
 
-                # INIT SOP
+                # INIT SOP (emits the full sop_update)
                 from app.routes.checklist_routes import initialize_checklist
                 initialize_checklist(sr_id, service_id)
 
                 # EMIT TO UI
                 from app.services.payload_builder import build_session_payload
-                from app.extensions import socketio
+                from app.services.session_emitter import session_emitter
 
                 payload = build_session_payload(sr_id)
-                payload["rp_id"] = rp_id
-                socketio.emit("service_locked", payload)
-                socketio.emit("sop_update", payload)
+                session_emitter.emit("service_locked", payload, rp_id)
 
-    # ---------------------------------
-    # Save chunk audit
-    last_chunk = (
-        db.session.query(ServiceChunk)
-        .filter(ServiceChunk.service_record_id == sr_id)
-        .order_by(ServiceChunk.chunk_id.desc())
-        .first()
-    )
-
-    chunk_id = ServiceChunk.generate_id(
-        last_chunk.chunk_id if last_chunk else None
-    )
-    
-    MAX_CHUNK_LEN = 254
 
-    chunks = split_text(text, MAX_CHUNK_LEN)
-
-    last_chunk = (
-        db.session.query(ServiceChunk)
-        .order_by(ServiceChunk.chunk_id.desc())
-        .first()
-    )
-
-    prev_chunk_id = last_chunk.chunk_id if last_chunk else None
-
-    for part in chunks:
-        new_chunk_id = ServiceChunk.generate_id(prev_chunk_id)
+# =====================================
+# START INGESTOR
+# =====================================
+def start_ingestor(app):
+    global transcription_pool, batch_scheduler, control_queue
 
-        chunk = ServiceChunk(
-            chunk_id=new_chunk_id,
-            service_record_id=sr_id,
-            text_chunk=part,
-            created_at=datetime.now(timezone.utc)
+    # Batched inference: workers hand PCM to one shared scheduler
+    if app.config["STT_BATCH_SIZE"] > 1:
+        batch_scheduler = BatchScheduler(
+            max_batch=app.config["STT_BATCH_SIZE"],
+            max_wait_ms=app.config["STT_BATCH_WAIT_MS"]
         )
+        batch_scheduler.start()
+
+    transcription_pool = TranscriptionPool(
+        app,
+        handle_rp_message,
+        size=app.config["STT_WORKERS"],
+        transcriber=batch_scheduler.transcribe if batch_scheduler else None,
+        max_per_rp=app.config["AUDIO_QUEUE_PER_RP"],
+        policy=app.config["AUDIO_OVERLOAD_POLICY"],
+        late_ms=app.config["AUDIO_LATE_MS"]
+    )
+    transcription_pool.start()
 
-        db.session.add(chunk)
-        prev_chunk_id = new_chunk_id
-
-    db.session.commit()
+    control_queue = RPQueue(
+        "control",
+        app.config["CONTROL_QUEUE_PER_RP"],
+        app.config["CONTROL_OVERLOAD_POLICY"]
+    )
+    threading.Thread(target=_run_control, args=(app,), name="kws-control", daemon=True).start()
 
-    print(f"[DB] {len(chunks)} chunks saved SR={sr_id}")
+    with app.app_context():
+        session_registry.rebuild()
 
+    # Supervisor floor view applies session events on its own thread
+    floor_state.start(app)
 
+    # Connect the control publisher now rather than on the first end command
+    publisher.start()
 
-# =====================================
-# START INGESTOR
-# =====================================
-def start_ingestor(app):
     print("[INGESTOR] Connecting to MQTT...", MQTT_BROKER, MQTT_PORT)
     client = mqtt.Client(userdata={"app": app})
     client.on_message = on_message
@@ -264,18 +299,19 @@ def start_ingestor(app):
 
     print("[INGESTOR] subscribed:", AUDIO_TOPIC, KWS_TOPIC)
 
-    threading.Thread(
-        target=audio_worker,
-        args=(app,),
-        daemon=True
-    ).start()
-
     client.loop_start()
 
     print("[API SERVER READY]")
 
-def split_text(text, max_len):
-    return [text[i:i+max_len] for i in range(0, len(text), max_len)]
+def get_ingestor_stats() -> dict:
+    if transcription_pool is None:
+        return {"queue_depth": 0, "workers": []}
+    stats = transcription_pool.stats()
+    if batch_scheduler is not None:
+        stats["batching"] = batch_scheduler.stats()
+    if control_queue is not None:
+        stats["control"] = control_queue.stats()
+    return stats
 
 def normalize_whisper_text(text: str) -> str:
     # text = text.replace("...", ",")
@@ -0,0 +1,127 @@
+# app/services/batch_scheduler.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.services.whisper_model import get_stt_backend
+from scripts.stt_whisper import pcm_to_16k
+
+
+class _Request:
+    __slots__ = ("audio", "language", "future")
+
+    def __init__(self, audio, language):
+        self.audio = audio
+        self.language = language
+        self.future = Future()
+
+
+class BatchScheduler:
+    """
+    Collects chunks from many RPs and decodes them in one batched
+    Whisper forward pass (STTBackend.transcribe_batch).
+
+    Callers block in transcribe() until their own result is ready; the
+    scheduler thread waits at most `max_wait_ms` after the first pending
+    chunk to fill a batch of up to `max_batch` mel segments (each padded
+    to Whisper's 30 s window).
+
+    Prompts are not used: one forward pass shares a single prompt, and
+    every session's transcript tail differs, so prompted requests would
+    never batch together (see Config.STT_BATCH_SIZE).
+    """
+
+    def __init__(self, max_batch: int = 8, max_wait_ms: int = 150):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+
+        self.batches = 0
+        self.items = 0
+        self.prompts_dropped = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="stt-batcher",
+            daemon=True
+        )
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread.start()
+        print(
+            f"[STT] batch scheduler started "
+            f"max_batch={self.max_batch} max_wait={int(self.max_wait * 1000)}ms"
+        )
+
+    # ---------------------------------
+    # Caller side (STT workers)
+    # ---------------------------------
+    def transcribe(self, pcm, sample_rate=16000, language="id", initial_prompt=None) -> str:
+        if initial_prompt:
+            self.prompts_dropped += 1
+        req = _Request(pcm_to_16k(pcm, sample_rate), language)
+        self.queue.put(req)
+        return req.future.result()
+
+    # ---------------------------------
+    # Scheduler thread
+    # ---------------------------------
+    def _collect(self) -> list:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        backend = get_stt_backend()
+
+        while True:
+            batch = self._collect()
+            t0 = time.monotonic()
+
+            # One DecodingOptions per forward pass: group by language
+            groups = {}
+            for req in batch:
+                groups.setdefault(req.language, []).append(req)
+
+            for language, reqs in groups.items():
+                try:
+                    texts = backend.transcribe_batch(
+                        [r.audio for r in reqs],
+                        language=language
+                    )
+                    for req, text in zip(reqs, texts):
+                        req.future.set_result(text)
+                except Exception as e:
+                    print("[STT] batch decode error:", e)
+                    for req in reqs:
+                        req.future.set_exception(e)
+
+            self.batches += 1
+            self.items += len(batch)
+            self.busy_seconds += time.monotonic() - t0
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "queue_depth": self.queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "prompts_dropped": self.prompts_dropped,
+            "utilisation": round(self.busy_seconds / uptime, 3) if uptime else 0.0,
+        }
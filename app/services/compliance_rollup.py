@@ -0,0 +1,116 @@
+# app/services/compliance_rollup.py
+
+from sqlalchemy import case, delete, func, literal
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from app.extensions import db
+from app.models.daily_compliance import DailyCompliance
+from app.models.service_record import ServiceRecord
+from app.utils.scoring import calculate_session_score, session_score_expr
+
+ROLLUP_COLUMNS = [
+    "day", "workstation_id", "user_id", "service_id",
+    "sessions", "normal_flow", "score_sum", "duration_sum", "duration_count",
+]
+
+
+def rollup_session(record: ServiceRecord):
+    """
+    Add one finished session to its daily_compliance row (upsert).
+    Runs in the caller's transaction.
+    """
+    _upsert_session(record, record.user_id, 1)
+
+
+def reassign_session_user(record: ServiceRecord, old_user_id):
+    """
+    A finished session got its user after finalization (e.g. manual end
+    before login): move it from `old_user_id`'s row to record.user_id's.
+    Runs in the caller's transaction.
+    """
+    if old_user_id == record.user_id:
+        return
+    _upsert_session(record, old_user_id, -1)
+    _upsert_session(record, record.user_id, 1)
+
+    if record.start_time:
+        db.session.execute(
+            delete(DailyCompliance).where(
+                DailyCompliance.day == record.start_time.date(),
+                DailyCompliance.workstation_id == record.workstation_id,
+                DailyCompliance.user_id == (old_user_id or ""),
+                DailyCompliance.service_id == (record.service_id or ""),
+                DailyCompliance.sessions <= 0
+            )
+        )
+
+
+def _upsert_session(record: ServiceRecord, user_id, sign: int):
+    if not record.start_time:
+        return
+
+    duration = record.duration if record.duration and record.duration > 0 else 0
+
+    stmt = mysql_insert(DailyCompliance).values(
+        day=record.start_time.date(),
+        workstation_id=record.workstation_id,
+        user_id=user_id or "",
+        service_id=record.service_id or "",
+        sessions=sign,
+        normal_flow=sign if record.is_normal_flow else 0,
+        score_sum=sign * calculate_session_score(record),
+        duration_sum=sign * duration,
+        duration_count=sign if duration else 0
+    )
+    db.session.execute(stmt.on_duplicate_key_update(
+        sessions=DailyCompliance.sessions + stmt.inserted.sessions,
+        normal_flow=DailyCompliance.normal_flow + stmt.inserted.normal_flow,
+        score_sum=DailyCompliance.score_sum + stmt.inserted.score_sum,
+        duration_sum=DailyCompliance.duration_sum + stmt.inserted.duration_sum,
+        duration_count=DailyCompliance.duration_count + stmt.inserted.duration_count
+    ))
+
+
+def rebuild_rollup(since=None, until=None):
+    """
+    Recompute daily_compliance from service_records for start_time in
+    [since, until) (dates; None = unbounded). Caller commits.
+    """
+    has_duration = ServiceRecord.duration > 0
+    day = func.date(ServiceRecord.start_time)
+
+    grouped = (
+        db.session.query(
+            day,
+            ServiceRecord.workstation_id,
+            func.coalesce(ServiceRecord.user_id, literal("")),
+            func.coalesce(ServiceRecord.service_id, literal("")),
+            func.count(),
+            func.sum(case((ServiceRecord.is_normal_flow == 1, 1), else_=0)),
+            func.sum(session_score_expr()),
+            func.sum(case((has_duration, ServiceRecord.duration), else_=0)),
+            func.sum(case((has_duration, 1), else_=0))
+        )
+        .filter(ServiceRecord.end_time.isnot(None))
+    )
+
+    clear = delete(DailyCompliance)
+    if since:
+        grouped = grouped.filter(ServiceRecord.start_time >= since)
+        clear = clear.where(DailyCompliance.day >= since)
+    if until:
+        grouped = grouped.filter(ServiceRecord.start_time < until)
+        clear = clear.where(DailyCompliance.day < until)
+
+    grouped = grouped.group_by(
+        day,
+        ServiceRecord.workstation_id,
+        func.coalesce(ServiceRecord.user_id, literal("")),
+        func.coalesce(ServiceRecord.service_id, literal(""))
+    )
+
+    db.session.execute(clear)
+    result = db.session.execute(
+        DailyCompliance.__table__.insert().from_select(ROLLUP_COLUMNS, grouped.statement)
+    )
+    return result.rowcount
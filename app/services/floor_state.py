@@ -0,0 +1,431 @@
+# app/services/floor_state.py
+
+import logging
+import queue
+import threading
+from datetime import datetime, time, timedelta, timezone
+from time import monotonic
+
+from sqlalchemy import func
+
+from app.config import Config
+from app.extensions import db, socketio
+from app.models.service_checklist import ServiceChecklist
+from app.models.service_record import ServiceRecord
+from app.models.user import User
+from app.models.workstation import Workstation
+from app.services.session_emitter import session_emitter, SUPERVISOR_ROOM
+
+# Events whose payload describes the session's service + SOP list
+SESSION_EVENTS = {"session_started", "sop_update", "service_locked"}
+# Minimum gap between reloads triggered by events of an unknown rp_id
+UNKNOWN_RP_RELOAD_S = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _started_on(day):
+    # Range on start_time (not DATE(start_time)) so idx_sr_start_time is used
+    day_start = datetime.combine(day, time.min)
+    return (
+        (ServiceRecord.start_time >= day_start)
+        & (ServiceRecord.start_time < day_start + timedelta(days=1))
+    )
+
+
+def sessions_on_query(day):
+    return db.session.query(func.count(ServiceRecord.service_record_id)).filter(_started_on(day))
+
+
+def alerts_on_query(day):
+    return (
+        db.session.query(ServiceRecord, User.name)
+        .outerjoin(User, ServiceRecord.user_id == User.user_id)
+        .filter(_started_on(day), ServiceRecord.is_normal_flow == 0)
+        .order_by(ServiceRecord.start_time.desc())
+    )
+
+
+class FloorState:
+    """
+    In-memory live view of the branch floor for the supervisor dashboard:
+    per workstation the active session, its user, service and checklist
+    progress, plus today's session count and bypass alerts.
+
+    Loaded from the DB on first use and then kept current from the events
+    that go through session_emitter; every change is pushed to the
+    supervisor room as `floor_update`. Events are applied on the model's
+    own thread (start()), never in the emitting thread, which may hold a
+    session lock. The model is reloaded (and pushed
+    as `floor_snapshot`) every `ttl_s`, at the day change and when an
+    event names an RP it does not know, so a missed event or a new
+    workstation only stays wrong until then.
+    """
+
+    def __init__(self, ttl_s: float = 300.0):
+        self.ttl_s = ttl_s
+        self._loaded_at = 0.0
+        self._stations = {}
+        self._rp_to_ws = {}
+        self._checked = {}
+        self._ended = set()
+        self._alerts = []
+        self._sessions_today = 0
+        self._day = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._loaded = False
+        self._events = queue.Queue()
+        self._started = False
+
+        self.events = 0
+        self.pushes = 0
+        self.rebuilds = 0
+
+    # =====================================
+    # LOAD
+    # =====================================
+    def rebuild(self):
+        day = _today()
+
+        workstations = db.session.query(Workstation).order_by(Workstation.workstation_id).all()
+
+        active = (
+            db.session.query(ServiceRecord, User.name)
+            .outerjoin(User, ServiceRecord.user_id == User.user_id)
+            .filter(ServiceRecord.end_time.is_(None))
+            .order_by(ServiceRecord.start_time.asc())
+            .all()
+        )
+
+        checked = {}
+        if active:
+            rows = (
+                db.session.query(
+                    ServiceChecklist.service_record_id,
+                    ServiceChecklist.step_id,
+                    ServiceChecklist.is_checked
+                )
+                .filter(ServiceChecklist.service_record_id.in_(
+                    [sr.service_record_id for sr, _ in active]
+                ))
+                .all()
+            )
+            for sr_id, step_id, is_checked in rows:
+                checked.setdefault(sr_id, {})[step_id] = bool(is_checked)
+
+        sessions_today = sessions_on_query(day).scalar()
+        alerts = alerts_on_query(day).all()
+
+        with self._lock:
+            self._stations = {
+                ws.workstation_id: {
+                    "workstation_id": ws.workstation_id,
+                    "pc_id": ws.pc_id,
+                    "rp_id": (ws.rpi_id or "").upper(),
+                    "location": ws.location,
+                    "session": None,
+                }
+                for ws in workstations
+            }
+            self._rp_to_ws = {
+                station["rp_id"]: ws_id
+                for ws_id, station in self._stations.items()
+                if station["rp_id"]
+            }
+            # Latest start wins if a workstation somehow has several open records
+            for sr, user_name in active:
+                if sr.workstation_id in self._stations:
+                    self._stations[sr.workstation_id]["session"] = self._session_entry(sr, user_name)
+            self._checked = checked
+            self._ended = set()
+            self._sessions_today = sessions_today
+            self._alerts = [self._alert_entry(sr, user_name) for sr, user_name in alerts]
+            self._day = day
+            self._loaded = True
+            self._loaded_at = monotonic()
+            self.rebuilds += 1
+
+        logger.info(
+            "[FLOOR] loaded %d workstation(s), %d active session(s), %d today",
+            len(workstations), len(active), sessions_today
+        )
+
+    def _stale(self) -> bool:
+        return (
+            not self._loaded
+            or _today() != self._day
+            or monotonic() - self._loaded_at >= self.ttl_s
+        )
+
+    def _refresh(self, push: bool):
+        if not self._stale():
+            return
+        # One thread reloads; the others wait and then see it fresh
+        with self._reload_lock:
+            if not self._stale():
+                return
+            self.rebuild()
+        if push:
+            self._push_snapshot()
+
+    def _reload_for_rp(self, rp_id: str):
+        # Workstation added since the last load (at most every UNKNOWN_RP_RELOAD_S)
+        with self._reload_lock:
+            if rp_id in self._rp_to_ws or monotonic() - self._loaded_at < UNKNOWN_RP_RELOAD_S:
+                return self._rp_to_ws.get(rp_id)
+            self.rebuild()
+        self._push_snapshot()
+        return self._rp_to_ws.get(rp_id)
+
+    @staticmethod
+    def _session_entry(sr, user_name):
+        return {
+            "service_record_id": sr.service_record_id,
+            "user_id": sr.user_id,
+            "user_name": user_name,
+            "service": sr.service_detected,
+            "start_time": _iso(sr.start_time),
+        }
+
+    @staticmethod
+    def _alert_entry(sr, user_name):
+        return {
+            "service_record_id": sr.service_record_id,
+            "user_name": user_name,
+            "service": sr.service_detected,
+            "reason": sr.reason,
+            "start_time": _iso(sr.start_time),
+        }
+
+    # =====================================
+    # VIEWS
+    # =====================================
+    def _station_view(self, station):
+        # caller holds self._lock
+        session = station["session"]
+        if session:
+            steps = self._checked.get(session["service_record_id"], {})
+            session = {
+                **session,
+                "steps_done": sum(steps.values()),
+                "steps_total": len(steps),
+            }
+        return {**station, "session": session}
+
+    def _totals(self):
+        # caller holds self._lock
+        return {
+            "sessions_today": self._sessions_today,
+            "active_ws": sum(1 for s in self._stations.values() if s["session"]),
+            "stations": len(self._stations),
+            "alerts": len(self._alerts),
+        }
+
+    def snapshot(self) -> dict:
+        self._refresh(push=False)
+        return self._snapshot()
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "stations": [
+                    self._station_view(self._stations[ws_id])
+                    for ws_id in sorted(self._stations)
+                ],
+                "alerts": list(self._alerts),
+                "totals": self._totals(),
+            }
+
+    # =====================================
+    # UPDATES (session_emitter listener)
+    # =====================================
+    def start(self, app):
+        if self._started:
+            return
+        self._started = True
+        threading.Thread(target=self._run, args=(app,), name="floor-state", daemon=True).start()
+
+    def _run(self, app):
+        while True:
+            event, payload = self._events.get()
+            with app.app_context():
+                try:
+                    self._handle(event, payload)
+                except Exception as e:
+                    logger.warning("[FLOOR] %s handling error: %s", event, e)
+                finally:
+                    db.session.remove()
+
+    def on_event(self, event: str, payload: dict):
+        """
+        Called by session_emitter for every queued event; only queues it.
+        """
+        if not self._loaded:
+            # The first snapshot reads everything from the DB anyway
+            return
+
+        self.events += 1
+        self._events.put((event, payload))
+
+    def _handle(self, event: str, payload: dict):
+        if event == "user_attached":
+            self._apply_user(**payload)
+            return
+
+        self._refresh(push=True)
+
+        rp_id = (payload.get("rp_id") or "").upper()
+        sr_id = payload.get("session_id")
+        ws_id = self._rp_to_ws.get(rp_id)
+        if not ws_id and rp_id:
+            ws_id = self._reload_for_rp(rp_id)
+        if not ws_id or not sr_id:
+            return
+
+        if event in SESSION_EVENTS:
+            self._apply_session(ws_id, sr_id, payload)
+        elif event == "sop_patch":
+            self._apply_steps(ws_id, sr_id, payload.get("steps", []))
+        elif event == "session_ended":
+            self._apply_end(ws_id, sr_id)
+
+    def _apply_session(self, ws_id, sr_id, payload):
+        with self._lock:
+            if sr_id in self._ended:
+                return
+            current = self._stations[ws_id]["session"]
+            is_new = not current or current["service_record_id"] != sr_id
+
+        # Only a session this model has not seen yet costs a query
+        entry = None
+        if is_new:
+            row = (
+                db.session.query(ServiceRecord, User.name)
+                .outerjoin(User, ServiceRecord.user_id == User.user_id)
+                .filter(ServiceRecord.service_record_id == sr_id)
+                .first()
+            )
+            if not row:
+                return
+            entry = self._session_entry(*row)
+
+        with self._lock:
+            station = self._stations[ws_id]
+            if entry:
+                station["session"] = entry
+                if entry["start_time"] and entry["start_time"][:10] == self._day.isoformat():
+                    self._sessions_today += 1
+            elif station["session"] is None:
+                return
+
+            if payload.get("service"):
+                station["session"]["service"] = payload["service"]
+            if "sop" in payload:
+                self._checked[sr_id] = {
+                    step["step_id"]: bool(step.get("checked"))
+                    for step in payload["sop"]
+                }
+            update = {"station": self._station_view(station), "totals": self._totals()}
+
+        self._push(update)
+
+    def _apply_steps(self, ws_id, sr_id, steps):
+        with self._lock:
+            station = self._stations[ws_id]
+            if not station["session"] or station["session"]["service_record_id"] != sr_id:
+                return
+            checked = self._checked.setdefault(sr_id, {})
+            for step in steps:
+                checked[step["step_id"]] = bool(step.get("checked"))
+            update = {"station": self._station_view(station), "totals": self._totals()}
+
+        self._push(update)
+
+    def _apply_end(self, ws_id, sr_id):
+        # Outcome (normal flow / reason) is only known from the finalized record
+        row = (
+            db.session.query(ServiceRecord, User.name)
+            .outerjoin(User, ServiceRecord.user_id == User.user_id)
+            .filter(ServiceRecord.service_record_id == sr_id)
+            .first()
+        )
+
+        with self._lock:
+            self._ended.add(sr_id)
+            self._checked.pop(sr_id, None)
+
+            station = self._stations[ws_id]
+            if station["session"] and station["session"]["service_record_id"] == sr_id:
+                station["session"] = None
+
+            alert = None
+            if row and not row[0].is_normal_flow:
+                alert = self._alert_entry(*row)
+                if alert["start_time"] and alert["start_time"][:10] == self._day.isoformat():
+                    self._alerts.insert(0, alert)
+                else:
+                    alert = None
+
+            update = {
+                "station": self._station_view(station),
+                "totals": self._totals(),
+                "alert": alert,
+            }
+
+        self._push(update)
+
+    def attach_user(self, workstation_id: str, service_record_id: str, user_id: str, user_name: str):
+        # Queued behind the session's own events
+        if not self._loaded:
+            return
+        self._events.put(("user_attached", {
+            "workstation_id": workstation_id,
+            "service_record_id": service_record_id,
+            "user_id": user_id,
+            "user_name": user_name,
+        }))
+
+    def _apply_user(self, workstation_id, service_record_id, user_id, user_name):
+        with self._lock:
+            station = self._stations.get(workstation_id)
+            session = station["session"] if station else None
+            if not session or session["service_record_id"] != service_record_id:
+                return
+            session["user_id"] = user_id
+            session["user_name"] = user_name
+            update = {"station": self._station_view(station), "totals": self._totals()}
+
+        self._push(update)
+
+    def _push(self, update: dict):
+        socketio.emit("floor_update", update, to=SUPERVISOR_ROOM)
+        self.pushes += 1
+
+    def _push_snapshot(self):
+        socketio.emit("floor_snapshot", self._snapshot(), to=SUPERVISOR_ROOM)
+        self.pushes += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "stations": len(self._stations),
+                "active_sessions": sum(1 for s in self._stations.values() if s["session"]),
+                "events": self.events,
+                "pushes": self.pushes,
+                "rebuilds": self.rebuilds,
+                "queued": self._events.qsize(),
+                "loaded_age_s": round(monotonic() - self._loaded_at, 1) if self._loaded else None,
+            }
+
+
+floor_state = FloorState(Config.FLOOR_STATE_TTL_S)
+session_emitter.add_listener(floor_state.on_event)
@@ -0,0 +1,93 @@
+# app/services/id_allocator.py
+
+import threading
+
+from sqlalchemy import Integer, cast, func, select, update
+
+from app.config import Config
+from app.extensions import db
+from app.models.id_sequence import IdSequence
+
+SERVICE_RECORD_PREFIX = "SR"
+CHUNK_PREFIX = "CU"
+CHECKLIST_PREFIX = "CE"
+
+
+class IdAllocator:
+    """
+    Hands out prefixed IDs (SR0001, CU0001, ...) from in-memory blocks.
+
+    A block is reserved by bumping the prefix's row in id_sequences under
+    a row lock, in its own short transaction, so it is safe across threads,
+    workers and processes. Inserts then need no read-before-write; IDs of
+    an unused block are simply skipped (gaps are fine).
+    """
+
+    def __init__(self, block_size: int = 50):
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, prefix: str, count: int) -> int:
+        with db.engine.begin() as conn:
+            start = conn.execute(
+                select(IdSequence.next_value)
+                .where(IdSequence.name == prefix)
+                .with_for_update()
+            ).scalar()
+
+            if start is None:
+                raise RuntimeError(f"id_sequences has no row for prefix {prefix}")
+
+            conn.execute(
+                update(IdSequence)
+                .where(IdSequence.name == prefix)
+                .values(next_value=start + count)
+            )
+        return start
+
+    def allocate(self, prefix: str, count: int = 1) -> list:
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                block = self._blocks.get(prefix)
+                if not block or block[0] >= block[1]:
+                    size = max(self.block_size, count - len(ids))
+                    start = self._reserve(prefix, size)
+                    block = [start, start + size]
+                    self._blocks[prefix] = block
+
+                take = min(count - len(ids), block[1] - block[0])
+                ids.extend(format_id(prefix, n) for n in range(block[0], block[0] + take))
+                block[0] += take
+        return ids
+
+
+def format_id(prefix: str, number: int) -> str:
+    # 4 digits minimum (legacy format), grows past 9999
+    return f"{prefix}{number:04d}"
+
+
+def id_number(column):
+    """
+    Numeric part of a prefixed ID column as an SQL expression. IDs are not
+    zero-padded past 9999 (SR10000 sorts before SR9999 as a string), so
+    order and compare IDs on this.
+    """
+    return cast(func.substring(column, 3), Integer)
+
+
+def parse_id_number(value: str) -> int:
+    # Raises ValueError for anything that is not PREFIX + digits
+    return int(value[2:])
+
+
+_allocator = IdAllocator(Config.ID_BLOCK_SIZE)
+
+
+def allocate_id(prefix: str) -> str:
+    return _allocator.allocate(prefix)[0]
+
+
+def allocate_ids(prefix: str, count: int) -> list:
+    return _allocator.allocate(prefix, count)
@@ -5,7 +5,7 @@ from app.services.session_manager import (
     end_session_by_rp,
     get_active_session_by_rp
 )
-from app.extensions import socketio
+from app.services.session_emitter import session_emitter
 from app.services.stream_controller import publish_end_stream
 from app.services.payload_builder import build_session_payload
 from app.routes.checklist_routes import initialize_checklist
@@ -59,11 +59,10 @@ def handle_kws_event(rp_id: str, payload: dict):
 
             initialize_checklist(sr_id, sr.service_id)
             
+            # The dashboard renders session_started like sop_update
             payload = build_session_payload(sr_id)
             if payload:
-                payload["rp_id"] = rp_id
-                socketio.emit("session_started", payload)
-                socketio.emit("sop_update", payload)
+                session_emitter.emit("session_started", payload, rp_id)
 
         else:
             print(f"[KWS] Failed to start session rp={rp_id}")
@@ -84,13 +83,13 @@ def handle_kws_event(rp_id: str, payload: dict):
             
             print(f"[KWS] END session SR={sr_id} rp={rp_id}")
 
-            socketio.emit(
+            session_emitter.emit(
                 "session_ended",
                 {
                     "session_id": sr_id,
-                    "reason": "Auto-ended (KWS selesai)",
-                    "rp_id": rp_id
-                }
+                    "reason": "Auto-ended (KWS selesai)"
+                },
+                rp_id
             )
         else:
             print(f"[KWS] No active session to end rp={rp_id}")
@@ -1,26 +1,18 @@
 from app.extensions import db
 from app.models.service_record import ServiceRecord
-from app.models.sop_step import SOPStep
 from app.models.service_checklist import ServiceChecklist
+from app.services.sop_engine import sop_catalog
 
 
 def build_session_payload(service_record_id: str):
-    sr = ServiceRecord.query.filter_by(
-        service_record_id=service_record_id
-    ).first()
+    sr = db.session.get(ServiceRecord, service_record_id)
 
     if not sr:
         return None
 
-    checklist = (
-        db.session.query(SOPStep, ServiceChecklist)
-        .outerjoin(
-            ServiceChecklist,
-            (ServiceChecklist.step_id == SOPStep.step_id) &
-            (ServiceChecklist.service_record_id == sr.service_record_id)
-        )
-        .filter(SOPStep.service_id == sr.service_id)
-        .order_by(SOPStep.step_number)
+    checked = dict(
+        db.session.query(ServiceChecklist.step_id, ServiceChecklist.is_checked)
+        .filter(ServiceChecklist.service_record_id == sr.service_record_id)
         .all()
     )
 
@@ -33,8 +25,8 @@ def build_session_payload(service_record_id: str):
             {
                 "step_id": step.step_id,
                 "description": step.step_description,
-                "checked": sc.is_checked if sc else False
+                "checked": bool(checked.get(step.step_id, False))
             }
-            for step, sc in checklist
+            for step in sop_catalog.steps_for(sr.service_id)
         ]
     }
@@ -0,0 +1,121 @@
+# app/services/rp_queue.py
+
+import threading
+import time
+from collections import defaultdict, deque
+
+OVERLOAD_POLICIES = {"drop_oldest", "drop_newest", "coalesce"}
+
+
+class RPQueue:
+    """
+    Bounded FIFO per RP, consumed round-robin across RPs.
+
+    Items of one RP stay in order; a busy RP cannot starve the others and
+    can only hold `max_per_rp` items. Overload policies:
+
+      drop_oldest  discard the oldest queued item
+      drop_newest  discard the incoming item
+      coalesce     drop_oldest, but an item with the same key as the
+                   newest queued one is dropped (the first one is kept)
+
+    Items put with `essential=True` are never coalesced or dropped: on
+    overflow the oldest non-essential item goes instead, and if there is
+    none the queue grows past `max_per_rp` (counted as `overflowed`).
+    """
+
+    def __init__(self, name: str, max_per_rp: int = 20, policy: str = "drop_oldest"):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy: {policy}")
+
+        self.name = name
+        self.max_per_rp = max(1, max_per_rp)
+        self.policy = policy
+
+        self._queues = {}
+        self._ready = deque()
+        self._cond = threading.Condition()
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.overflowed = 0
+        self.dropped_by_rp = defaultdict(int)
+
+    def put(self, rp_id: str, item, key=None, essential=False):
+        with self._cond:
+            q = self._queues.get(rp_id)
+            if q is None:
+                q = self._queues[rp_id] = deque()
+                self._ready.append(rp_id)
+
+            self.enqueued += 1
+
+            # Only a repeat of the newest item collapses, so order is kept;
+            # the first occurrence (and its timestamp) wins
+            if (
+                self.policy == "coalesce" and key is not None and not essential
+                and q and q[-1][0] == key and not q[-1][3]
+            ):
+                self.coalesced += 1
+                return
+
+            if len(q) >= self.max_per_rp:
+                if self.policy == "drop_newest" and not essential:
+                    self._drop(rp_id)
+                    return
+
+                victim = next((i for i, entry in enumerate(q) if not entry[3]), None)
+                if victim is not None:
+                    del q[victim]
+                    self._drop(rp_id)
+                elif essential:
+                    self.overflowed += 1
+                else:
+                    self._drop(rp_id)
+                    return
+
+            q.append((key, item, time.monotonic(), essential))
+            self._cond.notify()
+
+    def _drop(self, rp_id: str):
+        # caller holds self._cond
+        self.dropped += 1
+        self.dropped_by_rp[rp_id] += 1
+
+    def get(self):
+        """
+        Block until an item is available; returns (rp_id, item, enqueued_at).
+        """
+        with self._cond:
+            while not self._ready:
+                self._cond.wait()
+
+            rp_id = self._ready.popleft()
+            q = self._queues[rp_id]
+            _, item, enqueued_at, _ = q.popleft()
+
+            if q:
+                self._ready.append(rp_id)
+            else:
+                del self._queues[rp_id]
+
+            return rp_id, item, enqueued_at
+
+    def qsize(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queue": self.name,
+                "policy": self.policy,
+                "max_per_rp": self.max_per_rp,
+                "depth": {rp_id: len(q) for rp_id, q in self._queues.items()},
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "overflowed": self.overflowed,
+                "dropped_by_rp": dict(self.dropped_by_rp),
+            }
@@ -1,7 +1,12 @@
 # app/services/service_detector.py
 
+from collections import defaultdict, deque
 from typing import Tuple, List
+import logging
 import re
+import threading
+
+logger = logging.getLogger(__name__)
 
 # --------------------------------
 # Service keyword rules (weighted, ASR-aware)
@@ -97,6 +102,81 @@ def keyword_match(keyword: str, text: str) -> bool:
 def phrase_match(phrase: str, text: str) -> bool:
     return keyword_match(phrase, text)
 
+class CompiledRules:
+    """
+    SERVICE_RULES compiled into a token index.
+
+    Every keyword / intent phrase becomes a pattern (token set + weight);
+    each pattern is indexed under its tokens so a text only touches the
+    patterns sharing at least one token with it. A pattern matches when
+    all its tokens are in the text's token set (same rule as keyword_match).
+    """
+
+    def __init__(self, rules: dict):
+        self.services = list(rules.keys())
+        self.labels = {key: rule["label"] for key, rule in rules.items()}
+
+        # pattern = (service_key, phrase, tokens, weight); list order is
+        # the original rule order so hits / score sums stay identical
+        self.patterns = []
+        for service_key, rule in rules.items():
+            for kw, weight in rule["keywords"].items():
+                self.patterns.append((service_key, kw, frozenset(kw.split()), weight))
+            for phrase in rule.get("intents", []):
+                self.patterns.append((service_key, phrase, frozenset(phrase.split()), INTENT_SCORE))
+
+        self.index = defaultdict(list)
+        for idx, (_, _, tokens, _) in enumerate(self.patterns):
+            for token in tokens:
+                self.index[token].append(idx)
+
+    def match_tokens(self, tokens: set) -> list:
+        """
+        Indexes (in rule order) of all patterns matched by `tokens`.
+        """
+        candidates = set()
+        for token in tokens:
+            candidates.update(self.index.get(token, ()))
+
+        return sorted(
+            idx for idx in candidates
+            if self.patterns[idx][2] <= tokens
+        )
+
+    def score(self, matched: list):
+        """
+        Best (service_key, score, hits) for matched pattern indexes;
+        ties go to the service listed first in SERVICE_RULES.
+        """
+        scores = {}
+        hits = {}
+        for idx in matched:
+            service_key, phrase, _, weight = self.patterns[idx]
+            scores[service_key] = scores.get(service_key, 0.0) + weight
+            hits.setdefault(service_key, []).append(phrase)
+
+        best_service = None
+        best_score = 0.0
+        for service_key in self.services:
+            score = scores.get(service_key, 0.0)
+            if score > best_score:
+                best_service = service_key
+                best_score = score
+
+        return best_service, best_score, hits.get(best_service, [])
+
+
+_compiled = CompiledRules(SERVICE_RULES)
+
+
+def compile_rules():
+    """
+    Recompile after SERVICE_RULES is changed at runtime.
+    """
+    global _compiled
+    _compiled = CompiledRules(SERVICE_RULES)
+
+
 def detect_service(text: str) -> Tuple[str, str, float, List[str]]:
     """
     Returns:
@@ -110,52 +190,24 @@ def detect_service(text: str) -> Tuple[str, str, float, List[str]]:
         return None, None, 0.0, []
 
     norm_text = normalize_text(text)
-    print(f"[NLP] normalized_text='{norm_text}'")
-
-    best_service = None
-    best_score = 0.0
-    best_hits = []
-
-    for service_key, rule in SERVICE_RULES.items():
-        score = 0.0
-        hits = []
-
-        for kw, weight in rule["keywords"].items():
-            # if kw in norm_text:
-            #     score += weight
-            #     hits.append(kw)
-            if keyword_match(kw, norm_text):
-                score += weight
-                hits.append(kw)
-
-        for phrase in rule.get("intents", []):
-            if phrase_match(phrase, norm_text):
-                score += INTENT_SCORE
-                hits.append(phrase)
-
-        if hits:
-            print(
-                f"[NLP] candidate={service_key} "
-                f"hits={hits} score={score:.2f}"
-            )
-
-        if score > best_score:
-            best_service = service_key
-            best_score = score
-            best_hits = hits
+    compiled = _compiled
+
+    best_service, best_score, best_hits = compiled.score(
+        compiled.match_tokens(set(norm_text.split()))
+    )
 
     if best_service:
         confidence = min(1.0, best_score)
-        rule = SERVICE_RULES[best_service]
+        label = compiled.labels[best_service]
 
-        print(
-            f"[NLP] DETECTED service={best_service} "
-            f"label={rule['label']} conf={confidence}"
+        logger.debug(
+            "[NLP] DETECTED service=%s label=%s conf=%s hits=%s",
+            best_service, label, confidence, best_hits
         )
 
         return (
             best_service,
-            rule["label"],
+            label,
             confidence,
             best_hits
         )
@@ -166,4 +218,90 @@ def should_lock_service(service_key: str, confidence: float) -> bool:
     rule = SERVICE_RULES.get(service_key)
     if not rule:
         return False
-    return confidence >= rule["threshold"]
\ No newline at end of file
+    return confidence >= rule["threshold"]
+
+
+class IncrementalServiceDetector:
+    """
+    Per-session detector over a sliding window of the last `window` words.
+
+    Only the new tokens are processed: token counts are kept for the
+    window, and a pattern is (re)checked only when one of its tokens
+    enters or leaves the window. Per-chunk cost is O(new tokens) and
+    independent of the transcript length. Gives the same result as
+    detect_service(" ".join(last_window_words)).
+    """
+
+    def __init__(self, window: int = 30):
+        self.window = deque(maxlen=window)
+        self.counts = {}
+        self.matched = set()
+        self.lock = threading.Lock()
+
+    def _token_in(self, token, compiled):
+        count = self.counts.get(token, 0)
+        self.counts[token] = count + 1
+        if count:
+            return
+        for idx in compiled.index.get(token, ()):
+            if idx not in self.matched and all(
+                t in self.counts for t in compiled.patterns[idx][2]
+            ):
+                self.matched.add(idx)
+
+    def _token_out(self, token, compiled):
+        count = self.counts[token] - 1
+        if count:
+            self.counts[token] = count
+            return
+        del self.counts[token]
+        for idx in compiled.index.get(token, ()):
+            self.matched.discard(idx)
+
+    def feed(self, text: str):
+        """
+        Add new transcript text. Returns (service_key, label, confidence,
+        hits) once a service crosses its lock threshold, else None.
+        """
+        if not text:
+            return None
+
+        compiled = _compiled
+        with self.lock:
+            for token in normalize_text(text).split():
+                if len(self.window) == self.window.maxlen:
+                    self._token_out(self.window[0], compiled)
+                self.window.append(token)
+                self._token_in(token, compiled)
+
+            best_service, best_score, best_hits = compiled.score(sorted(self.matched))
+
+        if not best_service:
+            return None
+
+        confidence = min(1.0, best_score)
+        if not should_lock_service(best_service, confidence):
+            return None
+
+        return best_service, compiled.labels[best_service], confidence, best_hits
+
+
+# =====================================
+# PER-SESSION REGISTRY
+# =====================================
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_session_detector(service_record_id: str) -> IncrementalServiceDetector:
+    with _detectors_lock:
+        detector = _detectors.get(service_record_id)
+        if detector is None:
+            detector = IncrementalServiceDetector()
+            _detectors[service_record_id] = detector
+        return detector
+
+
+def pop_session_detector(service_record_id: str):
+    with _detectors_lock:
+        return _detectors.pop(service_record_id, None)
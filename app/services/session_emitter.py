@@ -0,0 +1,135 @@
+# app/services/session_emitter.py
+
+import threading
+
+from app.config import Config
+from app.extensions import socketio
+
+SUPERVISOR_ROOM = "supervisors"
+
+
+def rp_room(rp_id: str) -> str:
+    return f"rp:{rp_id.upper()}"
+
+
+class SessionEmitter:
+    """
+    Debounced, room-targeted Socket.IO emission.
+
+    Events are sent only to the workstation's room and the supervisor
+    room. Within `debounce_ms` all events for one RP are merged: a newer
+    payload replaces an older one of the same event (and moves to the end,
+    so events still go out in the order they were last queued), and checklist
+    changes are sent as `sop_patch` diffs (or folded into a pending full
+    `sop_update`) instead of full SOP lists.
+
+    Listeners (`add_listener`) see every event as it is queued, before
+    debouncing, in the emitting thread. Queued payloads are never
+    modified in place: listeners may keep them.
+    """
+
+    def __init__(self, debounce_ms: int = 100):
+        self.delay = debounce_ms / 1000.0
+        self._pending = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.sent = 0
+
+    def add_listener(self, callback):
+        """
+        callback(event, payload) for every emitted event.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, payload: dict):
+        for callback in self._listeners:
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"[EMITTER] listener error on {event}:", e)
+
+    def _schedule(self, rp_id: str) -> dict:
+        # caller holds self._lock
+        pending = self._pending.get(rp_id)
+        if pending is None:
+            pending = {}
+            self._pending[rp_id] = pending
+            timer = threading.Timer(self.delay, self.flush, args=(rp_id,))
+            timer.daemon = True
+            timer.start()
+        return pending
+
+    def emit(self, event: str, payload: dict, rp_id: str):
+        if not rp_id:
+            return
+        rp_id = rp_id.upper()
+        payload = {**payload, "rp_id": rp_id}
+
+        with self._lock:
+            pending = self._schedule(rp_id)
+            if event == "sop_update":
+                # A full list makes queued diffs redundant
+                pending.pop("sop_patch", None)
+            pending.pop(event, None)
+            pending[event] = payload
+            self.queued += 1
+
+        self._notify(event, payload)
+
+    def emit_steps(self, session_id: str, rp_id: str, steps: list):
+        """
+        Queue checklist step changes ({step_id, checked, checked_at}).
+        """
+        if not rp_id or not steps:
+            return
+        rp_id = rp_id.upper()
+
+        self._notify("sop_patch", {"session_id": session_id, "rp_id": rp_id, "steps": steps})
+
+        with self._lock:
+            pending = self._schedule(rp_id)
+            self.queued += 1
+
+            full = pending.get("sop_update")
+            if full and full.get("session_id") == session_id:
+                # Patched copy; the queued payload was already handed to listeners
+                changed = {s["step_id"]: s for s in steps}
+                pending["sop_update"] = {**full, "sop": [
+                    {**item, **changed[item["step_id"]]} if item["step_id"] in changed else item
+                    for item in full.get("sop", [])
+                ]}
+                return
+
+            patch = pending.setdefault("sop_patch", {
+                "session_id": session_id,
+                "rp_id": rp_id,
+                "steps": {}
+            })
+            for step in steps:
+                patch["steps"][step["step_id"]] = step
+
+    def flush(self, rp_id: str):
+        with self._lock:
+            pending = self._pending.pop(rp_id, None)
+        if not pending:
+            return
+
+        rooms = [rp_room(rp_id), SUPERVISOR_ROOM]
+        for event, payload in pending.items():
+            if event == "sop_patch":
+                payload = {**payload, "steps": list(payload["steps"].values())}
+            socketio.emit(event, payload, to=rooms)
+            self.sent += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "sent": self.sent,
+                "pending_rps": len(self._pending),
+            }
+
+
+session_emitter = SessionEmitter(Config.EMIT_DEBOUNCE_MS)
@@ -0,0 +1,183 @@
+# app/services/session_history.py
+
+from datetime import datetime, time, timezone
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import load_only
+
+from app.extensions import db
+from app.models.daily_compliance import DailyCompliance
+from app.models.service_record import ServiceRecord
+from app.services.id_allocator import id_number, parse_id_number
+from app.utils.scoring import calculate_session_score
+
+# Columns shown in the history tables (text / audio_path stay unloaded)
+LIST_COLUMNS = (
+    ServiceRecord.service_record_id,
+    ServiceRecord.service_detected,
+    ServiceRecord.start_time,
+    ServiceRecord.end_time,
+    ServiceRecord.duration,
+    ServiceRecord.is_normal_flow,
+    ServiceRecord.reason,
+)
+
+
+# =====================================
+# KEYSET PAGES
+# =====================================
+def encode_cursor(record) -> str:
+    return f"{record.start_time.isoformat()}_{record.service_record_id}"
+
+
+def decode_cursor(cursor: str):
+    """
+    Returns (start_time, service_record_id number) or None for a
+    missing/bad cursor.
+    """
+    if not cursor or "_" not in cursor:
+        return None
+    start, sr_id = cursor.rsplit("_", 1)
+    try:
+        return datetime.fromisoformat(start), parse_id_number(sr_id)
+    except ValueError:
+        return None
+
+
+def history_page_query(user_id: str, cursor: str = None, limit: int = 25, finished_only: bool = False):
+    """
+    limit + 1 rows after `cursor` (idx_sr_user_start_end). Ties on
+    start_time are broken on the numeric ID, not the ID string.
+    """
+    query = (
+        db.session.query(ServiceRecord)
+        .options(load_only(*LIST_COLUMNS))
+        .filter(ServiceRecord.user_id == user_id)
+    )
+    if finished_only:
+        query = query.filter(ServiceRecord.end_time.isnot(None))
+
+    after = decode_cursor(cursor)
+    if after:
+        start_time, sr_number = after
+        query = query.filter(or_(
+            ServiceRecord.start_time < start_time,
+            and_(
+                ServiceRecord.start_time == start_time,
+                id_number(ServiceRecord.service_record_id) < sr_number
+            )
+        ))
+
+    return (
+        query.order_by(
+            ServiceRecord.start_time.desc(),
+            id_number(ServiceRecord.service_record_id).desc()
+        )
+        .limit(limit + 1)
+    )
+
+
+def history_page(user_id: str, cursor: str = None, limit: int = 25, finished_only: bool = False):
+    """
+    One page of a user's sessions, newest first, after `cursor`
+    (seek on (start_time, service_record_id number), no OFFSET).
+
+    Returns (records, next_cursor); next_cursor is None on the last page.
+    Each record gets `session_score`.
+    """
+    records = history_page_query(user_id, cursor, limit, finished_only).all()
+
+    has_more = len(records) > limit
+    records = records[:limit]
+    for record in records:
+        record.session_score = calculate_session_score(record)
+
+    next_cursor = encode_cursor(records[-1]) if has_more else None
+    return records, next_cursor
+
+
+# =====================================
+# SUMMARY (AGGREGATES)
+# =====================================
+def rollup_summary_query(user_id: str):
+    # idx_daily_compliance_user_day
+    return db.session.query(
+        func.coalesce(func.sum(DailyCompliance.sessions), 0),
+        func.coalesce(func.sum(DailyCompliance.normal_flow), 0),
+        func.coalesce(func.sum(DailyCompliance.score_sum), 0),
+        func.coalesce(func.sum(DailyCompliance.duration_sum), 0),
+        func.coalesce(func.sum(DailyCompliance.duration_count), 0)
+    ).filter(DailyCompliance.user_id == user_id)
+
+
+def fastest_session_query(user_id: str):
+    # idx_sr_user_duration
+    return (
+        db.session.query(ServiceRecord.service_detected, ServiceRecord.duration)
+        .filter(ServiceRecord.user_id == user_id, ServiceRecord.duration > 0)
+        .order_by(ServiceRecord.duration.asc())
+        .limit(1)
+    )
+
+
+def latest_service_query(user_id: str):
+    # idx_sr_user_start_end
+    return (
+        db.session.query(ServiceRecord.service_detected)
+        .filter(ServiceRecord.user_id == user_id)
+        .order_by(ServiceRecord.start_time.desc())
+        .limit(1)
+    )
+
+
+def open_today_query(user_id: str):
+    # The rollup only has finished sessions (idx_sr_user_start_end range)
+    day_start = datetime.combine(datetime.now(timezone.utc).date(), time.min)
+    return (
+        db.session.query(func.count(ServiceRecord.service_record_id))
+        .filter(
+            ServiceRecord.user_id == user_id,
+            ServiceRecord.start_time >= day_start,
+            ServiceRecord.end_time.is_(None)
+        )
+    )
+
+
+def history_summary(user_id: str) -> dict:
+    """
+    Finished-session stats of one user from the daily_compliance rollup,
+    plus today's open sessions and the fastest / latest session via
+    index lookups. `total_sessions` counts both; scores and durations
+    cover finished sessions only.
+    """
+    sessions, normal_flow, score_sum, duration_sum, duration_count = (
+        rollup_summary_query(user_id).one()
+    )
+    fastest = fastest_session_query(user_id).first()
+    latest_service = latest_service_query(user_id).scalar()
+    open_sessions = int(open_today_query(user_id).scalar() or 0)
+
+    sessions = int(sessions)
+    return {
+        "total_sessions": sessions + open_sessions,
+        "completed_sessions": sessions,
+        "open_sessions": open_sessions,
+        "normal_flow": int(normal_flow),
+        "avg_score": round(float(score_sum) / sessions, 1) if sessions else 0,
+        "avg_duration": int(duration_sum) // int(duration_count) if duration_count else 0,
+        "fastest_service": fastest,
+        "latest_service": latest_service,
+    }
+
+
+def session_transcript(service_record_id: str, user_id: str = None):
+    """
+    The deferred transcript of one session (None if not found / not the user's).
+    """
+    query = db.session.query(ServiceRecord.text).filter(
+        ServiceRecord.service_record_id == service_record_id
+    )
+    if user_id is not None:
+        query = query.filter(ServiceRecord.user_id == user_id)
+    row = query.first()
+    return None if row is None else (row.text or "")
@@ -5,12 +5,34 @@ from typing import Optional
 
 from app.extensions import db
 from app.models.service_record import ServiceRecord
+from app.models.user import User
 from app.models.workstation import Workstation
 from app.models.service_checklist import ServiceChecklist
+from app.services.compliance_rollup import reassign_session_user
+from app.services.floor_state import floor_state
 from app.services.session_store import finalize_session
+from app.services.id_allocator import allocate_id, SERVICE_RECORD_PREFIX
+from app.services.session_registry import ActiveSession, session_registry
 from flask_login import current_user
 
 
+# ======================================================
+# QUERIES
+# ======================================================
+def active_record_query(workstation_id: str):
+    """
+    Open session of a workstation, latest first (idx_sr_workstation_end_start).
+    """
+    return (
+        db.session.query(ServiceRecord)
+        .filter(
+            ServiceRecord.workstation_id == workstation_id,
+            ServiceRecord.end_time.is_(None)
+        )
+        .order_by(ServiceRecord.start_time.desc())
+    )
+
+
 # ======================================================
 # START SESSION
 # ======================================================
@@ -34,14 +56,7 @@ def start_session(
         return None
 
     user_id = workstation.current_user_id
-    active = (
-        db.session.query(ServiceRecord)
-        .filter(
-            ServiceRecord.workstation_id == workstation.workstation_id,
-            ServiceRecord.end_time.is_(None)
-        )
-        .first()
-    )
+    active = active_record_query(workstation.workstation_id).first()
 
     if active:
         print(f"[SESSION] Already active SR={active.service_record_id}")
@@ -49,12 +64,18 @@ def start_session(
         if active.user_id is None and user_id is not None:
             active.user_id = user_id
             db.session.commit()
+            _publish_user(active, user_id)
             print(f"[SESSION] Attached user {user_id} to active SR={active.service_record_id}")
+        session_registry.put(ActiveSession(
+            rp_id,
+            active.service_record_id,
+            active.workstation_id,
+            active.service_id
+        ))
         return active.service_record_id
 
-    # Generate new service_record_id
-    last = db.session.query(ServiceRecord).order_by(ServiceRecord.service_record_id.desc()).first()
-    new_id = ServiceRecord.generate_id(last.service_record_id if last else None)
+    # Allocate new service_record_id
+    new_id = allocate_id(SERVICE_RECORD_PREFIX)
 
     # Create new session record
     record = ServiceRecord(
@@ -66,6 +87,7 @@ def start_session(
 
     db.session.add(record)
     db.session.commit()
+    session_registry.put(ActiveSession(rp_id, new_id, workstation.workstation_id))
     print(f"[SESSION] Started SR={new_id} rp={rp_id} user_id={user_id}")
     return new_id
 
@@ -82,20 +104,8 @@ def end_session_by_rp(
 
     rp_id = rp_id.upper()
 
-    record = (
-        db.session.query(ServiceRecord)
-        .select_from(ServiceRecord)
-        .join(
-            Workstation,
-            ServiceRecord.workstation_id == Workstation.workstation_id
-        )
-        .filter(
-            Workstation.rpi_id == rp_id,
-            ServiceRecord.end_time.is_(None)
-        )
-        .order_by(ServiceRecord.start_time.desc())
-        .first()
-    )
+    active = session_registry.get(rp_id)
+    record = db.session.get(ServiceRecord, active.service_record_id) if active else None
 
     if not record:
         print(f"[SESSION] No active session for rp={rp_id}")
@@ -131,25 +141,13 @@ def end_session_by_rp(
 # QUERY HELPERS
 # ======================================================
 
-def get_active_session_by_rp(rp_id: str) -> Optional[str]:
-    rp_id = rp_id.upper()
+def get_active_session(rp_id: str) -> Optional[ActiveSession]:
+    return session_registry.get(rp_id)
 
-    record = (
-        db.session.query(ServiceRecord)
-        .select_from(ServiceRecord)
-        .join(
-            Workstation,
-            ServiceRecord.workstation_id == Workstation.workstation_id
-        )
-        .filter(
-            Workstation.rpi_id == rp_id,
-            ServiceRecord.end_time.is_(None)
-        )
-        .order_by(ServiceRecord.start_time.desc())
-        .first()
-    )
 
-    return record.service_record_id if record else None
+def get_active_session_by_rp(rp_id: str) -> Optional[str]:
+    active = session_registry.get(rp_id)
+    return active.service_record_id if active else None
 
 
 def is_checklist_complete(service_record_id: str) -> bool:
@@ -201,6 +199,22 @@ def attach_user_to_active_session(rp_id: str, user_id: str):
         print(f"[DEBUG] No session found to attach user for RP={rp_id}")
         return None
 
+    old_user_id = record.user_id
     record.user_id = user_id
+    if record.end_time:
+        # Already in daily_compliance under no user
+        reassign_session_user(record, old_user_id)
     db.session.commit()
+    _publish_user(record, user_id)
     print(f"[DEBUG] User {user_id} attached to SR={record.service_record_id}")
+
+
+def _publish_user(record, user_id: str):
+    # Supervisor floor view shows who is serving
+    user = db.session.get(User, user_id)
+    floor_state.attach_user(
+        record.workstation_id,
+        record.service_record_id,
+        user_id,
+        user.name if user else None
+    )
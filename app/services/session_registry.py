@@ -0,0 +1,142 @@
+# app/services/session_registry.py
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.extensions import db
+from app.models.service_record import ServiceRecord
+from app.models.workstation import Workstation
+
+# Finalized SR ids remembered for late audio (oldest forgotten first)
+FINALIZED_KEEP = 10000
+SESSION_LOCK_STRIPES = 64
+
+
+@dataclass
+class ActiveSession:
+    rp_id: str
+    service_record_id: str
+    workstation_id: str
+    service_id: Optional[str] = None
+
+    @property
+    def locked(self) -> bool:
+        return self.service_id is not None
+
+
+class SessionRegistry:
+    """
+    In-process map rp_id -> ActiveSession.
+
+    Loaded from the DB once (startup / first use) and then kept current by
+    start_session, end_session_by_rp and finalize_session, so the audio,
+    KWS and checklist paths never query the DB to find their session.
+
+    Also remembers recently finalized sessions; `lock_for(sr_id)` is held
+    by finalize_session and by the ingestor around per-session writes, so
+    audio still in flight at the end cannot recreate session state.
+    """
+
+    def __init__(self):
+        self._by_rp = {}
+        self._finalized = OrderedDict()
+        self._sr_locks = [threading.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def rebuild(self):
+        rows = (
+            db.session.query(
+                Workstation.rpi_id,
+                ServiceRecord.service_record_id,
+                ServiceRecord.workstation_id,
+                ServiceRecord.service_id
+            )
+            .join(
+                Workstation,
+                ServiceRecord.workstation_id == Workstation.workstation_id
+            )
+            .filter(ServiceRecord.end_time.is_(None))
+            .order_by(ServiceRecord.start_time.asc())
+            .all()
+        )
+
+        with self._lock:
+            # Latest start wins if an RP somehow has several open records
+            self._by_rp = {
+                rp_id.upper(): ActiveSession(rp_id.upper(), sr_id, ws_id, service_id)
+                for rp_id, sr_id, ws_id, service_id in rows
+                if rp_id
+            }
+            self._loaded = True
+            self.rebuilds += 1
+
+        print(f"[REGISTRY] loaded {len(self._by_rp)} active session(s)")
+
+    def get(self, rp_id: str) -> Optional[ActiveSession]:
+        if not self._loaded:
+            self.rebuild()
+
+        with self._lock:
+            session = self._by_rp.get(rp_id.upper())
+            if session:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return session
+
+    def find_record(self, service_record_id: str) -> Optional[ActiveSession]:
+        with self._lock:
+            for session in self._by_rp.values():
+                if session.service_record_id == service_record_id:
+                    return session
+        return None
+
+    def put(self, session: ActiveSession):
+        with self._lock:
+            self._by_rp[session.rp_id.upper()] = session
+
+    def mark_locked(self, service_record_id: str, service_id: str):
+        with self._lock:
+            for session in self._by_rp.values():
+                if session.service_record_id == service_record_id:
+                    session.service_id = service_id
+
+    def remove_record(self, service_record_id: str):
+        with self._lock:
+            for rp_id, session in list(self._by_rp.items()):
+                if session.service_record_id == service_record_id:
+                    del self._by_rp[rp_id]
+
+    def lock_for(self, service_record_id: str) -> threading.Lock:
+        return self._sr_locks[hash(service_record_id) % len(self._sr_locks)]
+
+    def mark_finalized(self, service_record_id: str):
+        with self._lock:
+            self._finalized[service_record_id] = True
+            self._finalized.move_to_end(service_record_id)
+            while len(self._finalized) > FINALIZED_KEEP:
+                self._finalized.popitem(last=False)
+
+    def is_finalized(self, service_record_id: str) -> bool:
+        with self._lock:
+            return service_record_id in self._finalized
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active_sessions": len(self._by_rp),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "finalized_tracked": len(self._finalized),
+            }
+
+
+session_registry = SessionRegistry()
@@ -1,26 +1,105 @@
 # app/services/session_store.py
 
+import time
 from datetime import datetime, timezone
-from sqlalchemy import func
+from sqlalchemy import func, insert
 
+from app.config import Config
 from app.extensions import db
 from app.models.service_record import ServiceRecord
 from app.models.service_chunk import ServiceChunk
 from app.models.service_checklist import ServiceChecklist
+from app.services.id_allocator import allocate_id, allocate_ids, CHECKLIST_PREFIX, CHUNK_PREFIX
+from app.services.service_detector import pop_session_detector
+from app.services.session_registry import session_registry
+from app.services.streaming_transcriber import pop_session_tail
+from app.services.transcript_buffer import get_session_transcript, pop_session_transcript
+from app.services.vad import pop_session_vad
+from app.services.audio_decoder import pop_session_decoder
+from app.services.audio_archive import close_session_archive
+from app.services.compliance_rollup import rollup_session
+
+MAX_CHUNK_LEN = 254
 
 
 # =========================================
 # ID generators (KEEP)
 # =========================================
 def generate_checklist_id():
-    last = (
-        db.session.query(ServiceChecklist)
-        .order_by(ServiceChecklist.checklist_id.desc())
-        .first()
+    return allocate_id(CHECKLIST_PREFIX)
+
+
+def split_text(text, max_len):
+    return [text[i:i+max_len] for i in range(0, len(text), max_len)]
+
+
+# =========================================
+# Transcript chunks
+# =========================================
+def write_text_chunks(service_record_id: str, entries: list, commit: bool = True):
+    """
+    Insert (text, created_at) entries as service_chunks rows in one commit.
+    """
+    parts = [
+        (part, created_at)
+        for text, created_at in entries
+        for part in split_text(text, MAX_CHUNK_LEN)
+    ]
+    chunk_ids = allocate_ids(CHUNK_PREFIX, len(parts))
+
+    for chunk_id, (part, created_at) in zip(chunk_ids, parts):
+        db.session.add(ServiceChunk(
+            chunk_id=chunk_id,
+            service_record_id=service_record_id,
+            text_chunk=part,
+            created_at=created_at
+        ))
+
+    count = len(parts)
+
+    if commit:
+        db.session.commit()
+
+    print(f"[DB] {count} chunks saved SR={service_record_id}")
+
+
+def persisted_parts_query(service_record_id: str):
+    # idx_chunks_record_created
+    return (
+        db.session.query(ServiceChunk.text_chunk)
+        .filter_by(service_record_id=service_record_id)
+        .order_by(ServiceChunk.created_at.asc())
     )
-    if not last:
-        return "CE0001"
-    return f"CE{int(last.checklist_id[2:]) + 1:04d}"
+
+
+def _load_persisted_parts(service_record_id: str):
+    return [c.text_chunk for c in persisted_parts_query(service_record_id).all()]
+
+
+def append_transcript(service_record_id: str, text: str):
+    """
+    Append text to the session's in-memory transcript (write-behind).
+
+    service_chunks rows are written in batches; service_records.text is
+    only written on a periodic checkpoint and at finalization.
+    """
+    transcript = get_session_transcript(
+        service_record_id,
+        seed=lambda: _load_persisted_parts(service_record_id)
+    )
+    transcript.append(text)
+
+    if transcript.flush_due(Config.TRANSCRIPT_FLUSH_CHUNKS, Config.TRANSCRIPT_FLUSH_S):
+        write_text_chunks(service_record_id, transcript.take_pending())
+
+    if transcript.checkpoint_due(Config.TRANSCRIPT_CHECKPOINT_S):
+        db.session.query(ServiceRecord)\
+            .filter_by(service_record_id=service_record_id)\
+            .update({"text": transcript.text()})
+        db.session.commit()
+        transcript.last_checkpoint = time.monotonic()
+
+    return transcript
 
 
 # =========================================
@@ -31,6 +110,12 @@ def finalize_session(
     manual_termination: bool = False,
     reason: str | None = None
 ):
+    # Serialized with the ingestor's per-session writes (see audio_ingestor)
+    with session_registry.lock_for(service_record_id):
+        _finalize_session(service_record_id, manual_termination, reason)
+
+
+def _finalize_session(service_record_id, manual_termination, reason):
     record = (
         db.session.query(ServiceRecord)
         .filter_by(service_record_id=service_record_id)
@@ -40,6 +125,8 @@ def finalize_session(
         raise RuntimeError("ServiceRecord not found")
 
     if record.end_time:
+        session_registry.remove_record(service_record_id)
+        session_registry.mark_finalized(service_record_id)
         return
 
     # Determine normal flow or manual termination
@@ -73,16 +160,42 @@ def finalize_session(
             end = end.replace(tzinfo=timezone.utc)
         record.duration = int((end - start).total_seconds())
 
-    # Concatenate all text chunks
-    chunks = (
-        db.session.query(ServiceChunk.text_chunk)
-        .filter_by(service_record_id=service_record_id)
-        .order_by(ServiceChunk.created_at.asc())
-        .all()
-    )
-    record.text = " ".join(c.text_chunk for c in chunks)
+    # Flush buffered chunks + words the streaming decoder had not confirmed
+    transcript = pop_session_transcript(service_record_id)
+    pending = transcript.take_pending() if transcript else []
+
+    tail = pop_session_tail(service_record_id)
+    if tail:
+        pending.append((tail, datetime.now(timezone.utc)))
+        if transcript:
+            transcript.parts.append(tail)
+
+    if pending:
+        write_text_chunks(service_record_id, pending, commit=False)
+
+    if transcript:
+        record.text = transcript.text()
+        n_chunks = len(transcript.parts)
+    else:
+        # No in-memory transcript (e.g. restart): rebuild from service_chunks
+        parts = _load_persisted_parts(service_record_id)
+        record.text = " ".join(parts)
+        n_chunks = len(parts)
+
+    audio_path = close_session_archive(service_record_id)
+    if audio_path:
+        record.audio_path = audio_path
+
+    # Daily rollup row is updated in the same transaction
+    rollup_session(record)
 
     db.session.commit()
+    session_registry.remove_record(service_record_id)
+    session_registry.mark_finalized(service_record_id)
+    pop_session_detector(service_record_id)
+    pop_session_decoder(service_record_id)
+
+    vad = pop_session_vad(service_record_id)
 
     # Detailed logging
     print(
@@ -92,10 +205,50 @@ def finalize_session(
         f"DURATION={record.duration}s "
         f"NORMAL={record.is_normal_flow} "
         f"REASON={record.reason} "
-        f"CHUNKS={len(chunks)} "
-        f"TEXT_LEN={len(record.text or '')}"
+        f"CHUNKS={n_chunks} "
+        f"TEXT_LEN={len(record.text or '')} "
+        f"VAD_SKIPPED={vad.skipped_seconds if vad else 0:.1f}s"
     )
 
+def append_late_transcript(service_record_id: str, text: str):
+    """
+    Text decoded after the session was finalized: written straight to
+    service_chunks and appended to service_records.text.
+    """
+    if not text:
+        return
+    write_text_chunks(service_record_id, [(text, datetime.now(timezone.utc))], commit=False)
+    db.session.query(ServiceRecord)\
+        .filter_by(service_record_id=service_record_id)\
+        .update(
+            {"text": func.concat_ws(" ", ServiceRecord.text, text)},
+            synchronize_session=False
+        )
+    db.session.commit()
+    print(f"[SESSION] late text SR={service_record_id} len={len(text)}")
+
+
+def release_late_session(service_record_id: str, text: str = ""):
+    """
+    Audio that was in flight when the session was finalized may have
+    recreated per-session state: drop it again and persist any text.
+    Caller holds session_registry.lock_for(service_record_id).
+    """
+    pop_session_detector(service_record_id)
+    pop_session_decoder(service_record_id)
+    pop_session_vad(service_record_id)
+    close_session_archive(service_record_id)
+
+    parts = [text] if text else []
+    tail = pop_session_tail(service_record_id)
+    if tail:
+        parts.append(tail)
+    transcript = pop_session_transcript(service_record_id)
+    if transcript:
+        parts = [t for t, _ in transcript.take_pending()] + parts
+
+    append_late_transcript(service_record_id, " ".join(parts))
+
 # =========================================
 # Persist checklist (from UI)
 # =========================================
@@ -115,14 +268,22 @@ def save_checklist(
         .filter_by(service_record_id=service_record_id)\
         .delete()
 
-    for step in checklist_items:
-        db.session.add(ServiceChecklist(
-            checklist_id=generate_checklist_id(),
-            service_record_id=service_record_id,
-            step_id=step["step_id"],
-            is_checked=step.get("checked", False),
-            checked_at=step.get("checked_at")
-        ))
+    # One bulk INSERT with ids allocated up front
+    checklist_ids = allocate_ids(CHECKLIST_PREFIX, len(checklist_items))
+    if checklist_items:
+        db.session.execute(
+            insert(ServiceChecklist),
+            [
+                {
+                    "checklist_id": checklist_id,
+                    "service_record_id": service_record_id,
+                    "step_id": step["step_id"],
+                    "is_checked": step.get("checked", False),
+                    "checked_at": step.get("checked_at")
+                }
+                for checklist_id, step in zip(checklist_ids, checklist_items)
+            ]
+        )
 
     db.session.commit()
 
@@ -1,9 +1,124 @@
 # app/services/sop_engine.py
+import threading
+import time
+from dataclasses import dataclass
+
+from app.config import Config
 from app.models.sop_service import SOPService
 from app.models.sop_step import SOPStep
 from app.extensions import db
 
 
+@dataclass(frozen=True)
+class SOPStepDef:
+    step_id: str
+    service_id: str
+    step_number: int
+    step_description: str
+
+
+@dataclass(frozen=True)
+class SOPServiceDef:
+    service_id: str
+    service_name: str
+    steps: tuple
+
+
+class SOPCatalog:
+    """
+    Versioned in-memory copy of sop_services + sop_steps.
+
+    SOP definitions rarely change, so they are loaded once and reloaded
+    after `ttl` seconds or an explicit invalidate(). Checklist payloads
+    only need to join service_checklists rows against these steps.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.version = 0
+        self._loaded_at = None
+        self._services = {}
+        self._steps = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and (
+            time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def reload(self):
+        services = db.session.query(SOPService).order_by(SOPService.service_id).all()
+        steps = (
+            db.session.query(SOPStep)
+            .order_by(SOPStep.service_id, SOPStep.step_number.asc())
+            .all()
+        )
+
+        step_defs = {
+            s.step_id: SOPStepDef(s.step_id, s.service_id, s.step_number, s.step_description)
+            for s in steps
+        }
+
+        by_service = {}
+        for step in step_defs.values():
+            by_service.setdefault(step.service_id, []).append(step)
+
+        service_defs = {
+            s.service_id: SOPServiceDef(
+                s.service_id,
+                s.service_name,
+                tuple(by_service.get(s.service_id, ()))
+            )
+            for s in services
+        }
+
+        with self._lock:
+            self._services = service_defs
+            self._steps = step_defs
+            self._loaded_at = time.monotonic()
+            self.version += 1
+
+        print(f"[SOP] catalog v{self.version} loaded: {len(service_defs)} services, {len(step_defs)} steps")
+
+    def _ensure_fresh(self):
+        if not self._fresh():
+            self.reload()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def service(self, service_id: str):
+        self._ensure_fresh()
+        return self._services.get(service_id)
+
+    def services(self) -> list:
+        self._ensure_fresh()
+        return list(self._services.values())
+
+    def steps_for(self, service_id: str) -> tuple:
+        service = self.service(service_id)
+        return service.steps if service else ()
+
+    def step(self, step_id: str):
+        self._ensure_fresh()
+        return self._steps.get(step_id)
+
+    def all_steps(self) -> list:
+        self._ensure_fresh()
+        return sorted(self._steps.values(), key=lambda s: s.step_number)
+
+
+sop_catalog = SOPCatalog(Config.SOP_CACHE_TTL_S)
+
+
+def invalidate_sop_catalog():
+    """
+    Call after editing sop_services / sop_steps.
+    """
+    sop_catalog.invalidate()
+
+
 def load_sop_by_service_id(service_id: str):
     """
     Load SOP and steps using service_id (PRIMARY, SAFE METHOD)
@@ -12,22 +127,11 @@ def load_sop_by_service_id(service_id: str):
     if not service_id:
         return None
 
-    service = (
-        db.session.query(SOPService)
-        .filter_by(service_id=service_id)
-        .first()
-    )
+    service = sop_catalog.service(service_id)
 
     if not service:
         return None
 
-    steps = (
-        db.session.query(SOPStep)
-        .filter_by(service_id=service.service_id)
-        .order_by(SOPStep.step_number.asc())
-        .all()
-    )
-
     return {
         "service_id": service.service_id,
         "service_name": service.service_name,
@@ -39,6 +143,6 @@ def load_sop_by_service_id(service_id: str):
                 "checked": False,
                 "timestamp": None
             }
-            for step in steps
+            for step in service.steps
         ]
     }
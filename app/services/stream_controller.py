@@ -1,13 +1,206 @@
 # app/services/stream_controller.py
 import json
+import queue
+import threading
+import time
 from datetime import datetime, timezone
-import paho.mqtt.publish as publish
+import paho.mqtt.client as mqtt
 import os
 
+from app.config import Config
+
 MQTT_BROKER = os.getenv("MQTT_BROKER")
 MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
 
 
+class MqttPublisher:
+    """
+    Long-lived MQTT client for server -> RP control commands.
+
+    publish() only enqueues; a sender thread publishes over one persistent
+    connection (paho network loop in the background, auto-reconnect), so
+    callers never wait for broker connection setup. Failed publishes are
+    retried with backoff; latency is enqueue -> PUBACK.
+
+    Lock order: paho calls on_publish while holding its own message mutex,
+    so self._lock is never held around client.publish().
+    """
+
+    def __init__(self, host, port, max_retries=3, queue_size=1000, connect_wait_s=5.0):
+        self.host = host
+        self.port = port
+        self.max_retries = max_retries
+        self.connect_wait_s = connect_wait_s
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._inflight = {}
+        # mid -> ack time for PUBACKs that arrive before _run registers the mid
+        self._early_acks = {}
+        self._lock = threading.RLock()
+        self._connected = threading.Event()
+        self._started = False
+        self._down_since = time.monotonic()
+
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+
+        self.published = 0
+        self.retries = 0
+        self.failed = 0
+        self.dropped = 0
+        self.disconnected_s = 0.0
+        self.last_latency_ms = None
+        self.max_latency_ms = 0.0
+        self._latency_total_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        self.client.connect_async(self.host, self.port, 60)
+        self.client.loop_start()
+
+        threading.Thread(target=self._run, name="mqtt-publisher", daemon=True).start()
+        print("[PUBLISHER] started", self.host, self.port)
+
+    # ---------------------------------
+    # PAHO CALLBACKS
+    # ---------------------------------
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            print(f"[PUBLISHER] connect failed: {reason_code}")
+            return
+        if self._down_since is not None:
+            self.disconnected_s += time.monotonic() - self._down_since
+            self._down_since = None
+        self._connected.set()
+        print("[PUBLISHER] connected")
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self._connected.clear()
+        if self._down_since is None:
+            self._down_since = time.monotonic()
+        print(f"[PUBLISHER] disconnected: {reason_code}")
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        now = time.monotonic()
+        with self._lock:
+            item = self._inflight.pop(mid, None)
+            if item is None:
+                self._early_acks[mid] = now
+                return
+            self._record_ack(item, now)
+
+    def _record_ack(self, item, acked_at):
+        # caller holds self._lock
+        latency_ms = (acked_at - item["enqueued_at"]) * 1000
+        self.published += 1
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self._latency_total_ms += latency_ms
+
+    # ---------------------------------
+    # OUTBOUND QUEUE
+    # ---------------------------------
+    def publish(self, topic, payload, qos=1):
+        if not self._started:
+            self.start()
+
+        item = {
+            "topic": topic,
+            "payload": payload,
+            "qos": qos,
+            "attempts": 0,
+            "enqueued_at": time.monotonic()
+        }
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            print(f"[PUBLISHER] queue full, dropped {topic}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            self._wait_connected()
+
+            item["attempts"] += 1
+            try:
+                info = self.client.publish(
+                    item["topic"], item["payload"], qos=item["qos"]
+                )
+                if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                    self._track(info.mid, item)
+                    continue
+                error = mqtt.error_string(info.rc)
+            except Exception as e:
+                error = str(e)
+
+            self._retry(item, error)
+
+    def _wait_connected(self):
+        while not self._connected.wait(self.connect_wait_s):
+            down_since = self._down_since
+            down_s = time.monotonic() - down_since if down_since is not None else 0.0
+            print(
+                f"[PUBLISHER] broker unavailable for {down_s:.0f}s, "
+                f"{self._queue.qsize() + 1} command(s) waiting"
+            )
+
+    def _track(self, mid, item):
+        with self._lock:
+            acked_at = self._early_acks.pop(mid, None)
+            if acked_at is None:
+                self._inflight[mid] = item
+            else:
+                self._record_ack(item, acked_at)
+
+    def _retry(self, item, error):
+        if item["attempts"] > self.max_retries:
+            self.failed += 1
+            print(f"[PUBLISHER] giving up on {item['topic']}: {error}")
+            return
+
+        self.retries += 1
+        delay = min(2 ** item["attempts"] * 0.5, 10)
+        print(f"[PUBLISHER] retry {item['topic']} in {delay}s: {error}")
+        timer = threading.Timer(delay, self._queue.put, args=(item,))
+        timer.daemon = True
+        timer.start()
+
+    def stats(self) -> dict:
+        down_since = self._down_since
+        down_s = time.monotonic() - down_since if down_since is not None else 0.0
+        with self._lock:
+            return {
+                "connected": self._connected.is_set(),
+                "down_for_s": round(down_s, 1),
+                "disconnected_s": round(self.disconnected_s + down_s, 1),
+                "queue_depth": self._queue.qsize(),
+                "inflight": len(self._inflight),
+                "published": self.published,
+                "retries": self.retries,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "last_latency_ms": round(self.last_latency_ms, 1) if self.last_latency_ms is not None else None,
+                "avg_latency_ms": round(self._latency_total_ms / self.published, 1) if self.published else None,
+                "max_latency_ms": round(self.max_latency_ms, 1),
+            }
+
+
+publisher = MqttPublisher(
+    MQTT_BROKER,
+    MQTT_PORT,
+    max_retries=Config.MQTT_PUBLISH_RETRIES,
+    queue_size=Config.MQTT_PUBLISH_QUEUE
+)
+
+
 def publish_end_stream(rp_id: str):
     topic = f"server/control/{rp_id}/end"
 
@@ -16,12 +209,6 @@ def publish_end_stream(rp_id: str):
         "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
     }
 
-    publish.single(
-        topic,
-        payload=json.dumps(payload),
-        qos=1,
-        hostname=MQTT_BROKER,
-        port=MQTT_PORT
-    )
+    publisher.publish(topic, json.dumps(payload), qos=1)
 
-    print(f"[STREAM] end command sent to RP={rp_id}")
+    print(f"[STREAM] end command queued for RP={rp_id}")
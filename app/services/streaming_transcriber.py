@@ -0,0 +1,153 @@
+# app/services/streaming_transcriber.py
+
+import re
+import threading
+
+import numpy as np
+
+from app.config import Config
+from scripts.stt_whisper import TARGET_SR, pcm_to_16k
+
+
+def _word_key(word: str) -> str:
+    # Compare hypotheses loosely (case / punctuation may flip between passes)
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+class StreamingTranscriber:
+    """
+    Per-session incremental decoder.
+
+    Every new chunk is appended to a rolling audio window which is
+    re-transcribed with the tail of the transcript committed before that
+    window as prompt (never text whose audio is still in the window).
+    Words are committed once two consecutive hypotheses agree on them
+    (local agreement), so only newly stable text is emitted. When the
+    window reaches `max_window_s` the remaining hypothesis is committed
+    and the window restarts.
+
+    Committed text waits in the stream until the ingestor claim()s it
+    (under the session lock), so flush() at session end can emit it ahead
+    of the uncommitted tail even while a chunk is still in flight. A
+    chunk fed after flush() commits its whole hypothesis.
+    """
+
+    def __init__(self, max_window_s: float = 12.0, prompt_words: int = 30):
+        self.max_samples = int(max_window_s * TARGET_SR)
+        self.prompt_words = prompt_words
+
+        self.window = np.zeros(0, dtype=np.float32)
+        self.prev_hyp = []
+        self.committed_in_window = 0
+        self.window_words = []
+        self.committed_tail = []
+        self.unclaimed = []
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def _prompt(self):
+        if not self.committed_tail:
+            return None
+        return " ".join(self.committed_tail)
+
+    def _commit(self, words):
+        self.window_words += words
+        return " ".join(words)
+
+    def _take_unclaimed(self, text=""):
+        # caller holds self.lock
+        parts = self.unclaimed + ([text] if text else [])
+        self.unclaimed = []
+        return " ".join(parts)
+
+    def _reset_window(self):
+        # The window's audio is gone: its words may now prompt the next one
+        self.committed_tail = (self.committed_tail + self.window_words)[-self.prompt_words:]
+        self.window_words = []
+        self.window = np.zeros(0, dtype=np.float32)
+        self.prev_hyp = []
+        self.committed_in_window = 0
+
+    def feed(self, pcm, sample_rate, transcribe, language="id"):
+        """
+        Add one chunk; its newly stable text is kept for claim().
+        """
+        with self.lock:
+            self.window = np.concatenate([self.window, pcm_to_16k(pcm, sample_rate)])
+
+            hyp = transcribe(
+                self.window,
+                sample_rate=TARGET_SR,
+                language=language,
+                initial_prompt=self._prompt()
+            ).split()
+
+            agreed = 0
+            for a, b in zip(self.prev_hyp, hyp):
+                if _word_key(a) != _word_key(b):
+                    break
+                agreed += 1
+
+            new_words = hyp[self.committed_in_window:agreed]
+            self.committed_in_window = max(self.committed_in_window, agreed)
+            self.prev_hyp = hyp
+
+            if len(self.window) < self.max_samples and not self.closed:
+                text = self._commit(new_words)
+            else:
+                # Window full, or nobody will flush this stream again
+                text = self._commit(new_words + hyp[self.committed_in_window:])
+                self._reset_window()
+
+            if text:
+                self.unclaimed.append(text)
+
+    def claim(self) -> str:
+        """
+        Stable text fed since the last claim ("" if none, or if flush()
+        already emitted it).
+        """
+        with self.lock:
+            return self._take_unclaimed()
+
+    def flush(self) -> str:
+        """
+        Session end: unclaimed text followed by whatever is still pending,
+        without re-decoding.
+        """
+        with self.lock:
+            text = self._take_unclaimed(
+                self._commit(self.prev_hyp[self.committed_in_window:])
+            )
+            self._reset_window()
+            self.closed = True
+            return text
+
+
+# =====================================
+# PER-SESSION REGISTRY
+# =====================================
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_session_stream(service_record_id: str) -> StreamingTranscriber:
+    with _streams_lock:
+        stream = _streams.get(service_record_id)
+        if stream is None:
+            stream = StreamingTranscriber(
+                max_window_s=Config.STT_STREAM_WINDOW_S,
+                prompt_words=Config.STT_PROMPT_WORDS
+            )
+            _streams[service_record_id] = stream
+        return stream
+
+
+def pop_session_tail(service_record_id: str) -> str:
+    """
+    Drop the session's decoder and return its unclaimed + uncommitted
+    tail text.
+    """
+    with _streams_lock:
+        stream = _streams.pop(service_record_id, None)
+    return stream.flush() if stream else ""
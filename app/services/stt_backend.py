@@ -0,0 +1,134 @@
+# app/services/stt_backend.py
+
+# Engine libraries are imported by their backend only, so a ctranslate2
+# deployment never loads torch / openai-whisper.
+
+
+# =====================================
+# BACKEND INTERFACE
+# =====================================
+class STTBackend:
+    """
+    Speech-to-text engine behind transcribe_pcm().
+
+    `audio` is always 16kHz mono float32 (see scripts.stt_whisper.pcm_to_16k).
+    """
+
+    name = None
+
+    def transcribe(self, audio, language="id", initial_prompt=None) -> str:
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios, language="id", initial_prompt=None) -> list:
+        return [
+            self.transcribe(audio, language=language, initial_prompt=initial_prompt)
+            for audio in audios
+        ]
+
+
+# =====================================
+# OPENAI-WHISPER (PYTORCH, FLOAT32)
+# =====================================
+class WhisperTorchBackend(STTBackend):
+    name = "torch"
+
+    def __init__(self, model_size="small", cpu_threads=0):
+        try:
+            import torch
+            import whisper
+        except ImportError as e:
+            raise RuntimeError(
+                "STT_BACKEND=torch requires the 'torch' and 'openai-whisper' packages"
+            ) from e
+
+        if cpu_threads:
+            torch.set_num_threads(cpu_threads)
+        self.model = whisper.load_model(model_size)
+
+    def transcribe(self, audio, language="id", initial_prompt=None) -> str:
+        kwargs = {
+            "language": language,
+            "verbose": False,
+            "temperature": 0.0,
+        }
+
+        if initial_prompt:
+            kwargs["initial_prompt"] = initial_prompt
+
+        result = self.model.transcribe(audio, **kwargs)
+        return result.get("text", "").strip()
+
+    def transcribe_batch(self, audios, language="id", initial_prompt=None) -> list:
+        """
+        One forward pass over N segments, each padded to the 30 s window.
+        """
+        import torch
+        import whisper
+
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(audio)),
+                n_mels=self.model.dims.n_mels
+            )
+            for audio in audios
+        ]).to(self.model.device)
+
+        options = whisper.DecodingOptions(
+            language=language,
+            prompt=initial_prompt,
+            temperature=0.0,
+            without_timestamps=True,
+            fp16=self.model.device.type == "cuda"
+        )
+
+        with torch.no_grad():
+            results = whisper.decode(self.model, mel, options)
+
+        return [r.text.strip() for r in results]
+
+
+# =====================================
+# CTRANSLATE2 (FASTER-WHISPER, INT8 CPU)
+# =====================================
+class CTranslate2Backend(STTBackend):
+    name = "ctranslate2"
+
+    def __init__(self, model_size="small", compute_type="int8", cpu_threads=0):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "STT_BACKEND=ctranslate2 requires the 'faster-whisper' package"
+            ) from e
+
+        self.model = WhisperModel(
+            model_size,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=cpu_threads
+        )
+
+    def transcribe(self, audio, language="id", initial_prompt=None) -> str:
+        segments, _ = self.model.transcribe(
+            audio,
+            language=language,
+            temperature=0.0,
+            initial_prompt=initial_prompt or None,
+            condition_on_previous_text=False
+        )
+        return " ".join(s.text.strip() for s in segments).strip()
+
+
+BACKENDS = {
+    WhisperTorchBackend.name: WhisperTorchBackend,
+    CTranslate2Backend.name: CTranslate2Backend,
+}
+
+
+def create_backend(name, model_size="small", compute_type="int8", cpu_threads=0) -> STTBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown STT backend: {name}")
+
+    if name == CTranslate2Backend.name:
+        return CTranslate2Backend(model_size, compute_type, cpu_threads)
+    return WhisperTorchBackend(model_size, cpu_threads)
@@ -0,0 +1,73 @@
+# app/services/transcript_buffer.py
+
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class SessionTranscript:
+    """
+    In-memory transcript of one session.
+
+    Appends are O(1); text waiting to be written to service_chunks is kept
+    in `pending` until the session store flushes it in one batch.
+    """
+
+    def __init__(self, parts=None):
+        self.parts = list(parts or [])
+        self.pending = []
+
+        now = time.monotonic()
+        self.last_flush = now
+        self.last_checkpoint = now
+        self.lock = threading.Lock()
+
+    def append(self, text: str):
+        with self.lock:
+            self.parts.append(text)
+            self.pending.append((text, datetime.now(timezone.utc)))
+
+    def take_pending(self) -> list:
+        with self.lock:
+            pending, self.pending = self.pending, []
+            self.last_flush = time.monotonic()
+            return pending
+
+    def flush_due(self, max_chunks: int, max_seconds: float) -> bool:
+        return bool(self.pending) and (
+            len(self.pending) >= max_chunks
+            or time.monotonic() - self.last_flush >= max_seconds
+        )
+
+    def checkpoint_due(self, max_seconds: float) -> bool:
+        return time.monotonic() - self.last_checkpoint >= max_seconds
+
+    def text(self) -> str:
+        return " ".join(self.parts)
+
+
+# =====================================
+# PER-SESSION REGISTRY
+# =====================================
+_transcripts = {}
+_transcripts_lock = threading.Lock()
+
+
+def get_session_transcript(service_record_id: str, seed=None) -> SessionTranscript:
+    """
+    `seed` is called (once) to load already-persisted parts, e.g. after a
+    restart in the middle of a session.
+    """
+    with _transcripts_lock:
+        transcript = _transcripts.get(service_record_id)
+    if transcript is not None:
+        return transcript
+
+    transcript = SessionTranscript(seed() if seed else None)
+    with _transcripts_lock:
+        return _transcripts.setdefault(service_record_id, transcript)
+
+
+def pop_session_transcript(service_record_id: str):
+    with _transcripts_lock:
+        return _transcripts.pop(service_record_id, None)
@@ -0,0 +1,148 @@
+# app/services/transcription_pool.py
+
+import threading
+import time
+import zlib
+
+from app.services.rp_queue import RPQueue
+from app.services.whisper_model import get_stt_backend
+from scripts.stt_whisper import transcribe_pcm
+
+
+# =====================================
+# WORKER
+# =====================================
+class TranscriptionWorker:
+    """
+    One worker = one bounded per-RP input queue + one Whisper model.
+
+    The model is loaded in the worker thread (thread-local). Workers only
+    run in parallel while the model itself is inside torch / CTranslate2
+    (which release the GIL); decoding, VAD, whisper's Python-side decode
+    loop, DB work and emits all share the GIL. When a shared `transcriber`
+    is given (batched inference) the worker holds no model of its own.
+    Chunks that waited longer than `late_ms` in the queue are counted as
+    late.
+    """
+
+    def __init__(self, index: int, app, handler, transcriber=None,
+                 max_per_rp: int = 20, policy: str = "drop_oldest", late_ms: int = 5000):
+        self.index = index
+        self.app = app
+        self.handler = handler
+        self.mode = "batched" if transcriber else "thread"
+        self._transcriber = transcriber
+        self.queue = RPQueue(f"stt-{index}", max_per_rp, policy)
+        self.late_ms = late_ms
+
+        self.processed = 0
+        self.errors = 0
+        self.late = 0
+        self.max_wait_ms = 0.0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.current_rp = None
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"stt-worker-{index}",
+            daemon=True
+        )
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread.start()
+
+    def transcribe(self, *args, **kwargs) -> str:
+        if self._transcriber is not None:
+            return self._transcriber(*args, **kwargs)
+        return transcribe_pcm(*args, **kwargs)
+
+    def _run(self):
+        with self.app.app_context():
+            if self.mode == "thread":
+                get_stt_backend()
+
+            while True:
+                rp_id, payload, enqueued_at = self.queue.get()
+                self.current_rp = rp_id
+                t0 = time.monotonic()
+
+                wait_ms = (t0 - enqueued_at) * 1000
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+                if wait_ms > self.late_ms:
+                    self.late += 1
+                    print(f"[STT-{self.index}] late chunk rp={rp_id} waited={wait_ms:.0f}ms")
+
+                try:
+                    self.handler(rp_id, payload, transcribe=self.transcribe)
+                    self.processed += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[STT-{self.index}] processing error:", e)
+                finally:
+                    self.busy_seconds += time.monotonic() - t0
+                    self.current_rp = None
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "worker": self.index,
+            "mode": self.mode,
+            "queue_depth": self.queue.qsize(),
+            "processed": self.processed,
+            "errors": self.errors,
+            "late": self.late,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+            "dropped": self.queue.dropped,
+            "dropped_by_rp": dict(self.queue.dropped_by_rp),
+            "busy_seconds": round(self.busy_seconds, 2),
+            "utilisation": round(self.busy_seconds / uptime, 3) if uptime else 0.0,
+            "current_rp": self.current_rp,
+        }
+
+
+# =====================================
+# POOL
+# =====================================
+class TranscriptionPool:
+    """
+    Routes chunks to workers by rp_id so one RP always lands on the same
+    worker (chunks stay in order) while different RPs run in parallel.
+    """
+
+    def __init__(self, app, handler, size: int = 2, transcriber=None,
+                 max_per_rp: int = 20, policy: str = "drop_oldest", late_ms: int = 5000):
+        self.workers = [
+            TranscriptionWorker(i, app, handler, transcriber,
+                                max_per_rp=max_per_rp, policy=policy, late_ms=late_ms)
+            for i in range(max(1, size))
+        ]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        print(
+            f"[STT] {len(self.workers)} {self.workers[0].mode} "
+            f"worker(s) started"
+        )
+
+    def worker_for(self, rp_id: str) -> TranscriptionWorker:
+        # crc32 is stable across processes/restarts (unlike hash())
+        idx = zlib.crc32(rp_id.encode()) % len(self.workers)
+        return self.workers[idx]
+
+    def submit(self, rp_id: str, payload, essential: bool = False):
+        self.worker_for(rp_id).queue.put(rp_id, payload, essential=essential)
+
+    def queue_depth(self) -> int:
+        return sum(w.queue.qsize() for w in self.workers)
+
+    def stats(self) -> dict:
+        workers = [w.stats() for w in self.workers]
+        return {
+            "queue_depth": self.queue_depth(),
+            "dropped": sum(w["dropped"] for w in workers),
+            "late": sum(w["late"] for w in workers),
+            "workers": workers,
+        }
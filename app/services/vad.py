@@ -0,0 +1,130 @@
+# app/services/vad.py
+
+import threading
+
+import numpy as np
+
+from app.config import Config
+
+FRAME_MS = 30
+
+
+class SessionVAD:
+    """
+    Energy-based voice activity gate for one session.
+
+    Frames (30 ms) are speech when their level is above both the absolute
+    threshold and the session's running noise floor + margin, so a noisy
+    counter does not pass everything through. Chunks with too little
+    speech are dropped; the rest are trimmed to the speech span (+ pad).
+    """
+
+    def __init__(self, threshold_dbfs=-45.0, margin_db=10.0,
+                 min_speech_ms=300, pad_ms=200):
+        self.threshold_dbfs = threshold_dbfs
+        self.margin_db = margin_db
+        self.min_speech_ms = min_speech_ms
+        self.pad_ms = pad_ms
+
+        self.noise_floor = None
+        self.total_seconds = 0.0
+        self.skipped_seconds = 0.0
+        self.chunks = 0
+        self.dropped_chunks = 0
+
+    def _frame_levels(self, audio, frame_len):
+        n_frames = len(audio) // frame_len
+        frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        return 20.0 * np.log10(rms + 1e-10)
+
+    def process(self, pcm, sample_rate):
+        """
+        Returns the trimmed PCM (same dtype) or None if the chunk is non-speech.
+        """
+        duration = len(pcm) / sample_rate
+        self.chunks += 1
+        self.total_seconds += duration
+
+        frame_len = int(sample_rate * FRAME_MS / 1000)
+        audio = pcm.astype(np.float32)
+        if pcm.dtype == np.int16:
+            audio /= 32768.0
+
+        levels = self._frame_levels(audio, frame_len)
+        if len(levels) == 0:
+            self.dropped_chunks += 1
+            self.skipped_seconds += duration
+            return None
+
+        # Track the quietest part of recent chunks as the noise floor
+        floor = float(np.percentile(levels, 10))
+        self.noise_floor = floor if self.noise_floor is None else (
+            0.9 * self.noise_floor + 0.1 * floor
+        )
+
+        threshold = max(self.threshold_dbfs, self.noise_floor + self.margin_db)
+        speech = np.flatnonzero(levels > threshold)
+
+        if len(speech) * FRAME_MS < self.min_speech_ms:
+            self.dropped_chunks += 1
+            self.skipped_seconds += duration
+            return None
+
+        pad = int(self.pad_ms / FRAME_MS)
+        start = max(0, int(speech[0]) - pad) * frame_len
+        last = int(speech[-1]) + 1 + pad
+        end = len(pcm) if last >= len(levels) else last * frame_len
+
+        self.skipped_seconds += (len(pcm) - (end - start)) / sample_rate
+        return pcm[start:end]
+
+    def stats(self) -> dict:
+        return {
+            "chunks": self.chunks,
+            "dropped_chunks": self.dropped_chunks,
+            "audio_seconds": round(self.total_seconds, 1),
+            "skipped_seconds": round(self.skipped_seconds, 1),
+            "noise_floor_dbfs": round(self.noise_floor, 1) if self.noise_floor is not None else None,
+        }
+
+
+# =====================================
+# PER-SESSION REGISTRY
+# =====================================
+_sessions = {}
+_sessions_lock = threading.Lock()
+_totals = {"audio_seconds": 0.0, "skipped_seconds": 0.0}
+
+
+def get_session_vad(service_record_id: str) -> SessionVAD:
+    with _sessions_lock:
+        vad = _sessions.get(service_record_id)
+        if vad is None:
+            vad = SessionVAD(
+                threshold_dbfs=Config.VAD_THRESHOLD_DBFS,
+                margin_db=Config.VAD_MARGIN_DB,
+                min_speech_ms=Config.VAD_MIN_SPEECH_MS,
+                pad_ms=Config.VAD_PAD_MS
+            )
+            _sessions[service_record_id] = vad
+        return vad
+
+
+def pop_session_vad(service_record_id: str):
+    with _sessions_lock:
+        vad = _sessions.pop(service_record_id, None)
+        if vad:
+            _totals["audio_seconds"] += vad.total_seconds
+            _totals["skipped_seconds"] += vad.skipped_seconds
+    return vad
+
+
+def get_vad_stats() -> dict:
+    with _sessions_lock:
+        sessions = {sr_id: vad.stats() for sr_id, vad in _sessions.items()}
+        return {
+            "finished_audio_seconds": round(_totals["audio_seconds"], 1),
+            "finished_skipped_seconds": round(_totals["skipped_seconds"], 1),
+            "sessions": sessions,
+        }
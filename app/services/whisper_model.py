@@ -1,10 +1,34 @@
-import whisper
+import threading
 
-_model = None
+from app.config import Config
+from app.services.stt_backend import WhisperTorchBackend, create_backend
+
+# One backend per thread: each STT worker owns its own copy so
+# transcriptions never share (or serialize on) a single model.
+_local = threading.local()
+
+def get_stt_backend():
+    backend = getattr(_local, "backend", None)
+    if backend is None:
+        print(
+            f"[WHISPER] Loading {Config.STT_BACKEND} backend "
+            f"model={Config.STT_MODEL_SIZE} compute={Config.STT_COMPUTE_TYPE} "
+            f"threads={Config.STT_CPU_THREADS} ({threading.current_thread().name})..."
+        )
+        backend = create_backend(
+            Config.STT_BACKEND,
+            model_size=Config.STT_MODEL_SIZE,
+            compute_type=Config.STT_COMPUTE_TYPE,
+            cpu_threads=Config.STT_CPU_THREADS
+        )
+        _local.backend = backend
+    return backend
 
 def get_whisper_model():
-    global _model
-    if _model is None:
-        print("[WHISPER] Loading Whisper model...")
-        _model = whisper.load_model("small")
-    return _model
+    """
+    Raw openai-whisper model (only available with the torch backend).
+    """
+    backend = get_stt_backend()
+    if not isinstance(backend, WhisperTorchBackend):
+        raise RuntimeError(f"No openai-whisper model with STT_BACKEND={backend.name}")
+    return backend.model
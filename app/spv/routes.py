@@ -1,12 +1,19 @@
 import json
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import current_user, login_required
+from flask_socketio import emit, join_room
 from sqlalchemy import func
-from datetime import datetime, timezone
-from app.extensions import db
-from app.models import User, ServiceRecord, Workstation, SOPService
+from app.config import Config
+from app.extensions import db, socketio
+from app.models import User, Role, SOPService, DailyCompliance
 from app.utils.decorators import role_required
-from app.utils.scoring import calculate_session_score
+from app.services.audio_ingestor import get_ingestor_stats
+from app.services.vad import get_vad_stats
+from app.services.session_registry import session_registry
+from app.services.session_emitter import session_emitter, SUPERVISOR_ROOM
+from app.services.floor_state import floor_state
+from app.services.session_history import history_page, history_summary, session_transcript
+from app.services.stream_controller import publisher
 
 spv_bp = Blueprint(
     "spv",
@@ -19,60 +26,11 @@ spv_bp = Blueprint(
 @login_required
 @role_required(["Supervisor"])
 def dashboard():
-    today = datetime.now(timezone.utc).date()
-
-    total_sessions = (
-        db.session.query(ServiceRecord)
-        .filter(func.date(ServiceRecord.start_time) == today)
-        .count()
-    )
-
-    stations = (
-        db.session.query(
-            Workstation,
-            ServiceRecord,
-            User
-        )
-        .outerjoin(
-            ServiceRecord,
-            (ServiceRecord.workstation_id == Workstation.workstation_id)
-            & (ServiceRecord.end_time.is_(None))
-        )
-        .outerjoin(
-            User,
-            ServiceRecord.user_id == User.user_id
-        )
-        .order_by(Workstation.workstation_id)
-        .all()
-    )
-
-    active_ws = sum(1 for _, session, _ in stations if session is not None)
-
-    alerts = (
-        db.session.query(ServiceRecord, User)
-        .join(User, ServiceRecord.user_id == User.user_id)
-        .filter(
-            func.date(ServiceRecord.start_time) == today,
-            ServiceRecord.is_normal_flow == 0
-        )
-        .order_by(ServiceRecord.start_time.desc())
-        .all()
-    )
-    
-    # Debug
-    for ws, sr, user in stations:
-        print(
-            f"[DASHBOARD] {ws.workstation_id} "
-            f"session={'YES' if sr else 'NO'} "
-            f"sr_id={sr.service_record_id if sr else None}"
-        )
-
+    # Live floor model (no per-request queries); the page then follows
+    # floor_update pushes over Socket.IO
     return render_template(
         "spv/dashboard.html",
-        total_sessions=total_sessions,
-        stations=stations,
-        active_ws=active_ws,
-        alerts=alerts
+        floor=floor_state.snapshot()
     )
 
 
@@ -114,67 +72,56 @@ def reject_user(user_id):
 @login_required
 @role_required(["Supervisor"])
 def performance_analytics():
-    # 1. Ambil data sesi yang sudah selesai untuk statistik utama
-    finished_query = ServiceRecord.query.filter(ServiceRecord.end_time.isnot(None))
-    total_sessions = finished_query.count()
-    
+    # Dibaca dari rollup harian (daily_compliance), bukan scan service_records
+    rollup = DailyCompliance
+
+    # 1. Total sesi selesai + Average Performance Score seluruh tim
+    total_sessions, score_sum = db.session.query(
+        func.coalesce(func.sum(rollup.sessions), 0),
+        func.sum(rollup.score_sum)
+    ).one()
+    total_sessions = int(total_sessions)
+
     # Penanganan jika belum ada data sesi sama sekali
     if total_sessions == 0:
         return render_template("spv/performance-analytics.html", 
                                total_sessions=0, compliance_rate=0,
                                dates="[]", totals="[]", compliances="[]", leaderboard=[])
 
-    # 2. Hitung Average Performance Score (Weighted) untuk seluruh tim
-    # Kita ambil semua sesi selesai dan kirim objeknya ke calculate_session_score
-    all_sessions = finished_query.all()
-    total_weighted_sum = sum(calculate_session_score(s) for s in all_sessions)
-    compliance_rate = round(total_weighted_sum / total_sessions, 1)
+    compliance_rate = round(float(score_sum) / total_sessions, 1)
     
-    # 3. Trend Data untuk Chart (Dikelompokkan berdasarkan tanggal)
+    # 2. Trend Data untuk Chart (Dikelompokkan berdasarkan tanggal)
     trend_data = db.session.query(
-        func.date(ServiceRecord.start_time).label('date'),
-        func.count(ServiceRecord.service_record_id).label('total'),
-        func.sum(ServiceRecord.is_normal_flow).label('compliant')
-    ).filter(ServiceRecord.end_time.isnot(None))\
-     .group_by(func.date(ServiceRecord.start_time))\
-     .order_by('date').all()
+        rollup.day.label('date'),
+        func.sum(rollup.sessions).label('total'),
+        func.sum(rollup.normal_flow).label('compliant')
+    ).group_by(rollup.day)\
+     .order_by(rollup.day).all()
 
     dates = [d.date.strftime('%d %b') for d in trend_data]
     totals = [int(d.total) for d in trend_data]
     compliances = [int(d.compliant if d.compliant else 0) for d in trend_data]
 
-    # 4. Leaderboard Staf (Menghitung rata-rata skor per individu)
-    # Gunakan join untuk mendapatkan nama user dan data sesinya sekaligus
-    raw_leaderboard = db.session.query(
-        User.user_id, 
-        User.name, 
-        ServiceRecord
-    ).join(ServiceRecord, User.user_id == ServiceRecord.user_id)\
-     .filter(ServiceRecord.end_time.isnot(None)).all()
-
-    processed_stats = {}
-    for uid, name, record in raw_leaderboard:
-        # Panggil fungsi scoring dengan mengirim objek 'record' utuh
-        score = calculate_session_score(record)
-        
-        if uid not in processed_stats:
-            processed_stats[uid] = {"name": name, "total_score": 0, "count": 0}
-        
-        processed_stats[uid]["total_score"] += score
-        processed_stats[uid]["count"] += 1
-
-    final_leaderboard = []
-    for uid, data in processed_stats.items():
-        final_leaderboard.append({
-            "user_id": uid,
-            "name": data["name"],
-            # Menghitung rata-rata skor performa per staf
-            "avg_score": round(data["total_score"] / data["count"], 1),
-            "count": data["count"]
-        })
-
-    # Urutkan dari skor tertinggi (Top Performers)
-    final_leaderboard = sorted(final_leaderboard, key=lambda x: x['avg_score'], reverse=True)
+    # 3. Leaderboard Staf (rata-rata skor per individu, urut skor tertinggi)
+    avg_user_score = func.sum(rollup.score_sum) / func.sum(rollup.sessions)
+    leaderboard_rows = db.session.query(
+        User.user_id,
+        User.name,
+        avg_user_score.label('avg_score'),
+        func.sum(rollup.sessions).label('count')
+    ).join(rollup, User.user_id == rollup.user_id)\
+     .group_by(User.user_id, User.name)\
+     .order_by(avg_user_score.desc()).all()
+
+    final_leaderboard = [
+        {
+            "user_id": row.user_id,
+            "name": row.name,
+            "avg_score": round(float(row.avg_score), 1),
+            "count": int(row.count)
+        }
+        for row in leaderboard_rows
+    ]
 
     return render_template("spv/performance-analytics.html", 
                            total_sessions=total_sessions,
@@ -193,40 +140,65 @@ def performance_analytics():
 @role_required(["Supervisor"])
 def staff_performance_detail(user_id):
     staff = User.query.get_or_404(user_id)
-    
-    # Filter: Hanya sesi yang SUDAH SELESAI
-    sessions = ServiceRecord.query.filter(
-        ServiceRecord.user_id == user_id,
-        ServiceRecord.end_time.isnot(None)
-    ).order_by(ServiceRecord.start_time.desc()).all()
-    
-    total = len(sessions)
-    avg_performance = 0
-    avg_dur = 0
-    
-    if total > 0:
-        total_weighted_score = 0
-        valid_durations = []
-        
-        for s in sessions:
-            # Hitung skor tiap sesi (Sesuai CS: 100, 90, 80, 40, 60)
-            s.calculated_score = calculate_session_score(s)
-            total_weighted_score += s.calculated_score
-            
-            if s.duration and s.duration > 0:
-                valid_durations.append(s.duration)
-        
-        # Rata-rata Skor (Weighted)
-        avg_performance = round(total_weighted_score / total, 1)
-        
-        if valid_durations:
-            avg_dur = int(sum(valid_durations) / len(valid_durations))
+
+    # Sesi yang SUDAH SELESAI, per halaman (?before=<cursor>)
+    cursor = request.args.get("before")
+    sessions, next_cursor = history_page(
+        user_id,
+        cursor=cursor,
+        limit=Config.HISTORY_PAGE_SIZE,
+        finished_only=True
+    )
+    summary = history_summary(user_id)
 
     return render_template(
         "spv/staff-detail.html", 
         staff=staff, 
         sessions=sessions, 
-        total=total, 
-        avg_performance=avg_performance,
-        avg_dur=avg_dur
-    )
\ No newline at end of file
+        cursor=cursor,
+        next_cursor=next_cursor,
+        total=summary["completed_sessions"], 
+        normal_count=summary["normal_flow"],
+        avg_performance=summary["avg_score"],
+        avg_dur=summary["avg_duration"]
+    )
+
+
+@spv_bp.route("/sessions/<service_record_id>/transcript")
+@login_required
+@role_required(["Supervisor"])
+def session_transcript_json(service_record_id):
+    text = session_transcript(service_record_id)
+    if text is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify({"service_record_id": service_record_id, "text": text})
+
+
+# =========================================
+# SYSTEM STATS (PIPELINE HEALTH, JSON)
+# =========================================
+@spv_bp.route("/system-stats")
+@login_required
+@role_required(["Supervisor"])
+def system_stats():
+    return jsonify({
+        "ingestor": get_ingestor_stats(),
+        "vad": get_vad_stats(),
+        "session_registry": session_registry.stats(),
+        "emitter": session_emitter.stats(),
+        "mqtt_publisher": publisher.stats(),
+        "floor_state": floor_state.stats(),
+    })
+
+
+@socketio.on("connect")
+def handle_connect(auth=None):
+    # Supervisors receive the events of every workstation
+    if not current_user.is_authenticated:
+        return
+
+    role = db.session.get(Role, current_user.role_id)
+    if role and role.role_name == "Supervisor":
+        join_room(SUPERVISOR_ROOM)
+        # Resync after (re)connect; pushes only carry changes
+        emit("floor_snapshot", floor_state.snapshot())
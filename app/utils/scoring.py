@@ -1,15 +1,39 @@
 # app/utils/scoring.py
+from sqlalchemy import case
+
+from app.models.service_record import ServiceRecord
+
+NORMAL_FLOW_SCORE = 100
+DEFAULT_SCORE = 100
+
+# Skor sesi tidak normal berdasarkan ServiceRecord.reason
+REASON_WEIGHTS = {
+    "System Error / AI not responding": 100,
+    "Customer cancelled or left early": 100,
+    "Staff forgot to finish session": 75
+}
+
+
 def calculate_session_score(record):
     """
     Menghitung skor berdasarkan objek ServiceRecord
     """
     if record.is_normal_flow == 1:
-        return 100
+        return NORMAL_FLOW_SCORE
 
-    weights = {
-        "System Error / AI not responding": 100,
-        "Customer cancelled or left early": 100,
-        "Staff forgot to finish session": 75
-    }
     # Ambil skor berdasarkan record.reason
-    return weights.get(record.reason, 100)
\ No newline at end of file
+    return REASON_WEIGHTS.get(record.reason, DEFAULT_SCORE)
+
+
+def session_score_expr():
+    """
+    calculate_session_score as a SQL CASE, for AVG/SUM in grouped queries.
+    """
+    return case(
+        (ServiceRecord.is_normal_flow == 1, NORMAL_FLOW_SCORE),
+        *[
+            (ServiceRecord.reason == reason, score)
+            for reason, score in REASON_WEIGHTS.items()
+        ],
+        else_=DEFAULT_SCORE
+    )
@@ -160,3 +160,11 @@ INSERT INTO service_checklists (
 ("CE0005", "SR0001", "ST0034", 1, "2025-12-22 13:02:30"),
 ("CE0006", "SR0001", "ST0035", 1, "2025-12-22 13:02:45"),
 ("CE0007", "SR0001", "ST0036", 1, "2025-12-22 13:03:00");
+
+-- =========================
+-- ID SEQUENCES (continue after dummy rows)
+-- =========================
+UPDATE id_sequences SET next_value = 2 WHERE name = "SR";
+UPDATE id_sequences SET next_value = 8 WHERE name = "CE";
+
+-- Daily compliance rollup for the rows above: python -m scripts.rollup
@@ -0,0 +1,52 @@
+-- =========================
+-- 001: central ID allocator
+-- =========================
+-- Block-based ID allocation (app/services/id_allocator.py) replaces the
+-- ORDER BY ... DESC LIMIT 1 lookups. IDs keep the PREFIX + 4 digit
+-- format but may grow past 9999, so the ID columns are widened (order
+-- IDs with id_allocator.id_number, not as strings).
+--
+-- MySQL commits each statement on its own, so every statement here must
+-- be safe to re-run after a partial failure: the table is created only
+-- if missing, each ALTER is atomic and ends with the same columns and
+-- CHECK constraint whether or not it ran before, and the seeds only move
+-- next_value forward.
+
+CREATE TABLE IF NOT EXISTS id_sequences (
+    name VARCHAR(2) PRIMARY KEY,
+    next_value BIGINT NOT NULL DEFAULT 1
+);
+
+SET FOREIGN_KEY_CHECKS = 0;
+
+ALTER TABLE service_records
+    MODIFY service_record_id VARCHAR(12) NOT NULL,
+    DROP CHECK chk_service_record_id,
+    ADD CONSTRAINT chk_service_record_id CHECK(service_record_id REGEXP '^SR[0-9]{4,10}$');
+
+ALTER TABLE service_chunks
+    MODIFY chunk_id VARCHAR(12) NOT NULL,
+    MODIFY service_record_id VARCHAR(12),
+    DROP CHECK chk_chunk_id,
+    ADD CONSTRAINT chk_chunk_id CHECK(chunk_id REGEXP '^CU[0-9]{4,10}$');
+
+ALTER TABLE service_checklists
+    MODIFY checklist_id VARCHAR(12) NOT NULL,
+    MODIFY service_record_id VARCHAR(12),
+    DROP CHECK chk_checklist_id,
+    ADD CONSTRAINT chk_checklist_id CHECK(checklist_id REGEXP '^CE[0-9]{4,10}$');
+
+SET FOREIGN_KEY_CHECKS = 1;
+
+-- Continue numbering after the highest existing ID
+INSERT INTO id_sequences (name, next_value)
+SELECT 'SR', COALESCE(MAX(CAST(SUBSTRING(service_record_id, 3) AS UNSIGNED)), 0) + 1 FROM service_records
+ON DUPLICATE KEY UPDATE next_value = GREATEST(next_value, VALUES(next_value));
+
+INSERT INTO id_sequences (name, next_value)
+SELECT 'CU', COALESCE(MAX(CAST(SUBSTRING(chunk_id, 3) AS UNSIGNED)), 0) + 1 FROM service_chunks
+ON DUPLICATE KEY UPDATE next_value = GREATEST(next_value, VALUES(next_value));
+
+INSERT INTO id_sequences (name, next_value)
+SELECT 'CE', COALESCE(MAX(CAST(SUBSTRING(checklist_id, 3) AS UNSIGNED)), 0) + 1 FROM service_checklists
+ON DUPLICATE KEY UPDATE next_value = GREATEST(next_value, VALUES(next_value));
@@ -0,0 +1,21 @@
+-- =========================
+-- 002: daily compliance rollup
+-- =========================
+-- One row per (day, workstation, user, service) of finished sessions.
+-- Updated by finalize_session; fill it from history afterwards with
+--   python -m scripts.rollup
+
+CREATE TABLE IF NOT EXISTS daily_compliance (
+    day DATE NOT NULL,
+    workstation_id VARCHAR(10) NOT NULL,
+    user_id VARCHAR(10) NOT NULL DEFAULT '',
+    service_id VARCHAR(50) NOT NULL DEFAULT '',
+    sessions INT NOT NULL DEFAULT 0,
+    normal_flow INT NOT NULL DEFAULT 0,
+    score_sum INT NOT NULL DEFAULT 0,
+    duration_sum BIGINT NOT NULL DEFAULT 0,
+    duration_count INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (day, workstation_id, user_id, service_id),
+    INDEX idx_daily_compliance_user_day (user_id, day)
+);
@@ -0,0 +1,28 @@
+-- =========================
+-- 003: indexes for hot service_records / chunks / checklists queries
+-- =========================
+-- (InnoDB secondary indexes carry the primary key, so ORDER BY
+-- start_time, service_record_id is served by the start_time indexes.)
+-- Check with: python -m scripts.check_query_plans
+
+-- Active session per workstation: workstation_id = ? AND end_time IS NULL
+-- ORDER BY start_time DESC (CS dashboard, session start, SPV dashboard)
+CREATE INDEX idx_sr_workstation_end_start
+    ON service_records (workstation_id, end_time, start_time);
+
+-- Per-user history: user_id = ? [AND end_time IS NOT NULL]
+-- ORDER BY start_time DESC (my-history, staff detail)
+CREATE INDEX idx_sr_user_start_end
+    ON service_records (user_id, start_time, end_time);
+
+-- Day ranges: start_time >= :day AND start_time < :day + 1
+CREATE INDEX idx_sr_start_time
+    ON service_records (start_time);
+
+-- Transcript rebuild: service_record_id = ? ORDER BY created_at
+CREATE INDEX idx_chunks_record_created
+    ON service_chunks (service_record_id, created_at);
+
+-- Checklist lookups: service_record_id = ? [AND step_id = ?]
+CREATE INDEX idx_checklists_record_step
+    ON service_checklists (service_record_id, step_id);
@@ -0,0 +1,7 @@
+-- =========================
+-- 004: index for the per-user history summary
+-- =========================
+-- Fastest completion: user_id = ? AND duration > 0 ORDER BY duration LIMIT 1
+-- (my-history, staff detail). Paging itself uses idx_sr_user_start_end.
+CREATE INDEX idx_sr_user_duration
+    ON service_records (user_id, duration);
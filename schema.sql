@@ -1,6 +1,9 @@
 -- =========================
 -- DROP (ORDER MATTERS)
 -- =========================
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS daily_compliance;
+DROP TABLE IF EXISTS id_sequences;
 DROP TABLE IF EXISTS service_checklists;
 DROP TABLE IF EXISTS service_chunks;
 DROP TABLE IF EXISTS service_records;
@@ -87,7 +90,7 @@ CREATE TABLE sop_steps (
 -- SERVICE RECORDS
 -- =========================
 CREATE TABLE service_records (
-    service_record_id VARCHAR(6) PRIMARY KEY,
+    service_record_id VARCHAR(12) PRIMARY KEY,
     workstation_id VARCHAR(6),
     user_id VARCHAR(6),
     service_id VARCHAR(6),
@@ -101,7 +104,12 @@ CREATE TABLE service_records (
     reason VARCHAR(255),
     audio_path VARCHAR(255),
 
-    CONSTRAINT chk_service_record_id CHECK(service_record_id REGEXP '^SR[0-9]{4}$'),
+    INDEX idx_sr_workstation_end_start (workstation_id, end_time, start_time),
+    INDEX idx_sr_user_start_end (user_id, start_time, end_time),
+    INDEX idx_sr_start_time (start_time),
+    INDEX idx_sr_user_duration (user_id, duration),
+
+    CONSTRAINT chk_service_record_id CHECK(service_record_id REGEXP '^SR[0-9]{4,10}$'),
     CONSTRAINT fk_service_records_workstation_id
         FOREIGN KEY (workstation_id) REFERENCES workstations(workstation_id)
         ON UPDATE CASCADE ON DELETE CASCADE,
@@ -117,12 +125,14 @@ CREATE TABLE service_records (
 -- SERVICE CHUNKS
 -- =========================
 CREATE TABLE service_chunks (
-    chunk_id VARCHAR(6) PRIMARY KEY,
-    service_record_id VARCHAR(6),
+    chunk_id VARCHAR(12) PRIMARY KEY,
+    service_record_id VARCHAR(12),
     text_chunk VARCHAR(255),
     created_at TIMESTAMP NULL,
 
-    CONSTRAINT chk_chunk_id CHECK(chunk_id REGEXP '^CU[0-9]{4}$'),
+    INDEX idx_chunks_record_created (service_record_id, created_at),
+
+    CONSTRAINT chk_chunk_id CHECK(chunk_id REGEXP '^CU[0-9]{4,10}$'),
     CONSTRAINT fk_service_chunks_record_id
         FOREIGN KEY (service_record_id) REFERENCES service_records(service_record_id)
         ON UPDATE CASCADE ON DELETE CASCADE
@@ -132,17 +142,67 @@ CREATE TABLE service_chunks (
 -- SERVICE CHECKLISTS
 -- =========================
 CREATE TABLE service_checklists (
-    checklist_id VARCHAR(6) PRIMARY KEY,
-    service_record_id VARCHAR(6),
+    checklist_id VARCHAR(12) PRIMARY KEY,
+    service_record_id VARCHAR(12),
     step_id VARCHAR(6),
     is_checked BOOLEAN DEFAULT 0,
     checked_at TIMESTAMP NULL,
 
-    CONSTRAINT chk_checklist_id CHECK(checklist_id REGEXP '^CE[0-9]{4}$'),
+    INDEX idx_checklists_record_step (service_record_id, step_id),
+
+    CONSTRAINT chk_checklist_id CHECK(checklist_id REGEXP '^CE[0-9]{4,10}$'),
     CONSTRAINT fk_checklists_record_id
         FOREIGN KEY (service_record_id) REFERENCES service_records(service_record_id)
         ON UPDATE CASCADE ON DELETE CASCADE,
     CONSTRAINT fk_checklists_step_id
         FOREIGN KEY (step_id) REFERENCES sop_steps(step_id)
         ON UPDATE CASCADE ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- =========================
+-- ID SEQUENCES (block ID allocator)
+-- =========================
+CREATE TABLE id_sequences (
+    name VARCHAR(2) PRIMARY KEY,
+    next_value BIGINT NOT NULL DEFAULT 1
+);
+
+INSERT INTO id_sequences (name, next_value) VALUES
+("SR", 1),
+("CU", 1),
+("CE", 1);
+
+-- =========================
+-- DAILY COMPLIANCE ROLLUP (maintained by finalize_session)
+-- =========================
+CREATE TABLE daily_compliance (
+    day DATE NOT NULL,
+    workstation_id VARCHAR(10) NOT NULL,
+    user_id VARCHAR(10) NOT NULL DEFAULT '',
+    service_id VARCHAR(50) NOT NULL DEFAULT '',
+    sessions INT NOT NULL DEFAULT 0,
+    normal_flow INT NOT NULL DEFAULT 0,
+    score_sum INT NOT NULL DEFAULT 0,
+    duration_sum BIGINT NOT NULL DEFAULT 0,
+    duration_count INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (day, workstation_id, user_id, service_id),
+    INDEX idx_daily_compliance_user_day (user_id, day)
+);
+
+-- =========================
+-- SCHEMA MIGRATIONS (scripts/migrate.py)
+-- =========================
+-- This file already contains everything in migrations/ up to the
+-- versions below; mark them applied so `python -m scripts.migrate` only
+-- runs newer ones. Add a row here when a migration is folded in.
+CREATE TABLE schema_migrations (
+    version VARCHAR(100) PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version) VALUES
+("001_id_sequences.sql"),
+("002_daily_compliance.sql"),
+("003_hot_path_indexes.sql"),
+("004_history_indexes.sql");
@@ -0,0 +1,91 @@
+# scripts/check_query_plans.py
+#
+# EXPLAIN the hot per-request queries, built by the same functions the app
+# uses, and fail (exit 1) when one of them reads a hot table without an
+# index (type=ALL or key NULL).
+#   python -m scripts.check_query_plans
+# Run it against a database with realistic row counts: on near-empty
+# tables MySQL may prefer a scan and the check reports it as a failure.
+import sys
+from datetime import datetime, timezone
+
+from flask import Flask
+
+from app.config import Config
+from app.extensions import db
+from app.routes.checklist_routes import checklist_step_query
+from app.services.floor_state import alerts_on_query, sessions_on_query
+from app.services.session_history import (
+    fastest_session_query,
+    history_page_query,
+    latest_service_query,
+    open_today_query,
+    rollup_summary_query,
+)
+from app.services.session_manager import active_record_query
+from app.services.session_store import persisted_parts_query
+
+HOT_TABLES = {"service_records", "service_chunks", "service_checklists", "daily_compliance"}
+
+
+def hot_queries():
+    today = datetime.now(timezone.utc).date()
+    cursor = f"{datetime.now().isoformat()}_SR9999"
+
+    return {
+        "active session by workstation": active_record_query("WS0001").limit(1),
+        "user history (first page)": history_page_query("US0001", limit=Config.HISTORY_PAGE_SIZE),
+        "user history (keyset page)": history_page_query(
+            "US0001", cursor=cursor, limit=Config.HISTORY_PAGE_SIZE, finished_only=True
+        ),
+        "user fastest session": fastest_session_query("US0001"),
+        "user latest service": latest_service_query("US0001"),
+        "user rollup summary": rollup_summary_query("US0001"),
+        "user open sessions today": open_today_query("US0001"),
+        "sessions started today": sessions_on_query(today),
+        "today's alerts": alerts_on_query(today),
+        "transcript chunks": persisted_parts_query("SR0001"),
+        "checklist step": checklist_step_query("SR0001", "ST0001"),
+    }
+
+
+def explain(conn, query):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    result = conn.exec_driver_sql("EXPLAIN " + str(compiled), params)
+    return [dict(row._mapping) for row in result]
+
+
+def main():
+    # Bare app: no MQTT / ingestor
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    failures = 0
+    with app.app_context(), db.engine.connect() as conn:
+        for name, query in hot_queries().items():
+            for row in explain(conn, query):
+                table = row.get("table")
+                if table not in HOT_TABLES:
+                    continue
+
+                failed = row.get("type") == "ALL" or row.get("key") is None
+                failures += failed
+
+                status = "FAIL" if failed else "ok"
+                print(
+                    f"[PLAN] {status:4}  {name:32} {table:20} "
+                    f"type={row.get('type')} key={row.get('key')} rows={row.get('rows')}"
+                )
+
+    if failures:
+        print(f"[PLAN] {failures} hot query plan(s) without an index")
+        sys.exit(1)
+    print("[PLAN] all hot queries have an index")
+
+
+if __name__ == "__main__":
+    main()
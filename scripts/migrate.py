@@ -0,0 +1,121 @@
+# scripts/migrate.py
+#
+# Apply pending SQL migrations from migrations/ in filename order.
+#   python -m scripts.migrate            apply pending migrations
+#   python -m scripts.migrate --status   list applied / pending
+#
+# MySQL commits DDL implicitly, so a migration is never rolled back: a
+# failed one stays pending and is re-run from its first statement, and
+# every migration must be written to be safe to re-run (IF NOT EXISTS,
+# INSERT ... ON DUPLICATE KEY UPDATE). Errors that only mean "already
+# there" are skipped for the same reason.
+import os
+import re
+import sys
+
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.config import Config
+from app.extensions import db
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "migrations"
+)
+
+ALREADY_APPLIED_ERRORS = {
+    1050,  # table already exists
+    1060,  # duplicate column name
+    1061,  # duplicate key name
+}
+
+
+def split_statements(sql: str):
+    sql = re.sub(r"^\s*--.*$", "", sql, flags=re.MULTILINE)
+    return [s.strip() for s in sql.split(";") if s.strip()]
+
+
+def list_migrations():
+    return sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+
+
+def applied_versions(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version VARCHAR(100) PRIMARY KEY,"
+        " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _mysql_errno(error):
+    orig = getattr(error, "orig", None)
+    errno = getattr(orig, "errno", None)
+    if errno is None and orig is not None and orig.args:
+        errno = orig.args[0]
+    return errno
+
+
+def apply_migration(engine, filename, statements) -> bool:
+    """
+    Run one migration statement by statement (autocommit) and record it
+    only once all of them went through.
+    """
+    with engine.connect() as conn:
+        for i, stmt in enumerate(statements, start=1):
+            try:
+                conn.execute(text(stmt))
+            except DBAPIError as e:
+                if _mysql_errno(e) in ALREADY_APPLIED_ERRORS:
+                    print(f"[MIGRATE] {filename} #{i}: already applied, skipped")
+                    continue
+                # Never hand session settings (FOREIGN_KEY_CHECKS = 0) back to the pool
+                conn.invalidate()
+                print(f"[MIGRATE] {filename} failed at statement {i}/{len(statements)}: {e}")
+                return False
+
+        conn.execute(
+            text("INSERT INTO schema_migrations (version) VALUES (:v)"),
+            {"v": filename}
+        )
+    return True
+
+
+def main():
+    # Bare app: migrations must not start MQTT / Whisper services
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            applied = applied_versions(conn)
+
+        pending = [f for f in list_migrations() if f not in applied]
+
+        if "--status" in sys.argv:
+            for f in list_migrations():
+                print(f"[MIGRATE] {'applied' if f in applied else 'pending'}  {f}")
+            return
+
+        if not pending:
+            print("[MIGRATE] Schema is up to date")
+            return
+
+        engine = db.engine.execution_options(isolation_level="AUTOCOMMIT")
+
+        for filename in pending:
+            with open(os.path.join(MIGRATIONS_DIR, filename), encoding="utf-8") as f:
+                statements = split_statements(f.read())
+
+            if not apply_migration(engine, filename, statements):
+                print(f"[MIGRATE] {filename} left pending; fix the cause and re-run")
+                sys.exit(1)
+
+            print(f"[MIGRATE] applied {filename} ({len(statements)} statements)")
+
+
+if __name__ == "__main__":
+    main()
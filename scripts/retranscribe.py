@@ -0,0 +1,339 @@
+# scripts/retranscribe.py
+#
+# Re-transcribe finished sessions from their audio archive (after a
+# Whisper model, normalize_whisper_text or SERVICE_RULES change).
+#   python -m scripts.retranscribe                      all archived sessions
+#   python -m scripts.retranscribe --since 2025-12-01 --until 2026-01-01
+#   python -m scripts.retranscribe --sr SR0012 SR0013 --workers 4
+#   python -m scripts.retranscribe --reset              ignore the checkpoint
+#
+# Audio is decoded in --window second windows overlapping by --overlap
+# seconds; words both windows decoded are kept once. Sessions are
+# committed --batch at a time together with the daily_compliance rows of
+# their days; their IDs are then appended to the checkpoint file, so an
+# interrupted run continues where it stopped.
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import delete, insert, update
+
+from app.config import Config
+from app.extensions import db
+from app.models.service_checklist import ServiceChecklist
+from app.models.service_chunk import ServiceChunk
+from app.models.service_record import ServiceRecord
+from app.routes.checklist_routes import build_checklist_rows
+from app.services.audio_archive import META_FILE, load_index, load_meta, read_range
+from app.services.audio_ingestor import SERVICE_KEY_MAP, normalize_whisper_text
+from app.services.compliance_rollup import rebuild_rollup
+from app.services.id_allocator import allocate_ids, id_number, CHUNK_PREFIX
+from app.services.service_detector import IncrementalServiceDetector
+from app.services.session_store import MAX_CHUNK_LEN, split_text
+from app.services.whisper_model import get_stt_backend
+from scripts.stt_whisper import transcribe_pcm
+
+DEFAULT_CHECKPOINT = os.path.join(Config.AUDIO_PATH, "retranscribe.done")
+
+# Recorded when re-detection moves a session to another (or no) service:
+# the CS ticked the old SOP, so the new checklist starts unchecked
+SERVICE_CHANGED_REASON = "Service re-detected by re-transcription"
+
+
+# =====================================
+# WORKER PROCESS
+# =====================================
+def _init_worker():
+    # One STT backend per child process
+    get_stt_backend()
+
+
+def _key(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def overlap_length(prev_words, words, max_words):
+    """
+    Returns (drop, skip): drop the last `drop` words of the previous window
+    and the first `skip` words of this one, which decoded the same audio.
+    The previous window's last word may be cut by its edge, so a match
+    that ignores it is accepted too. At least two words must agree.
+    """
+    prev = [_key(w) for w in prev_words[-max_words:]]
+    new = [_key(w) for w in words[:max_words]]
+
+    for k in range(min(len(prev), len(new)), 1, -1):
+        if prev[-k:] == new[:k]:
+            return 0, k
+        if prev[-k - 1:-1] == new[:k] and len(prev) > k:
+            return 1, k
+    return 0, 0
+
+
+def transcribe_session(service_record_id: str, audio_path: str, window_s: float, overlap_s: float):
+    """
+    Streams the session archive in `window_s` windows starting every
+    `window_s - overlap_s` seconds (only one window in memory).
+    Returns (sr_id, [(offset_s, text)], audio_seconds); audio_seconds is
+    0 for an archive without audio (nothing is rewritten then).
+    """
+    index = load_index(audio_path)
+    if len(index) == 0 or not os.path.exists(os.path.join(audio_path, META_FILE)):
+        return service_record_id, [], 0.0
+    sample_rate = load_meta(audio_path)["sample_rate"]
+
+    total_s = int(index["start_sample"][-1] + index["n_samples"][-1]) / sample_rate
+    step_s = max(window_s - overlap_s, 1.0)
+
+    parts = []          # [offset_s, words]
+    offset = 0.0
+    while offset < total_s:
+        # Prompt only with words whose audio is not in this window
+        done = [w for _, words in parts for w in words]
+        if parts:
+            in_overlap = int(len(parts[-1][1]) * overlap_s / window_s)
+            done = done[:len(done) - in_overlap]
+        prompt = " ".join(done[-Config.STT_PROMPT_WORDS:]) or None
+
+        pcm, sr = read_range(audio_path, offset, offset + window_s)
+        words = normalize_whisper_text(transcribe_pcm(
+            pcm,
+            sample_rate=sr,
+            language="id",
+            initial_prompt=prompt
+        )).split()
+
+        if words and parts:
+            drop, skip = overlap_length(parts[-1][1], words, max_words=Config.STT_PROMPT_WORDS)
+            if drop:
+                del parts[-1][1][-drop:]
+            words = words[skip:]
+        if words:
+            parts.append([offset, words])
+        offset += step_s
+
+    return service_record_id, [(o, " ".join(w)) for o, w in parts if w], total_s
+
+
+# =====================================
+# DB WRITES (MAIN PROCESS)
+# =====================================
+def detect(parts):
+    # Same incremental detector / lock rule as the live ingestor
+    detector = IncrementalServiceDetector()
+    for _, text in parts:
+        detection = detector.feed(text)
+        if detection:
+            return detection
+    return None
+
+
+def write_batch(results, sessions):
+    """
+    One transaction for the whole batch: replace service_chunks, update
+    service_records text and recompute the daily_compliance rows of the
+    batch's days. `sessions` maps sr_id -> (start_time, service_id).
+
+    When detection ends on another service (or none), the service fields,
+    checklist and flow outcome follow it: a fresh unchecked checklist for
+    the new SOP and is_normal_flow = False.
+    """
+    # Sessions without archived audio keep their live transcript
+    results = [r for r in results if r[2] > 0]
+    if not results:
+        return
+
+    chunk_rows = []
+    for sr_id, parts, _ in results:
+        for offset, text in parts:
+            created_at = sessions[sr_id].start_time + timedelta(seconds=offset)
+            for piece in split_text(text, MAX_CHUNK_LEN):
+                chunk_rows.append({
+                    "service_record_id": sr_id,
+                    "text_chunk": piece,
+                    "created_at": created_at
+                })
+
+    for chunk_id, row in zip(allocate_ids(CHUNK_PREFIX, len(chunk_rows)), chunk_rows):
+        row["chunk_id"] = chunk_id
+
+    sr_ids = [sr_id for sr_id, _, _ in results]
+    db.session.execute(
+        delete(ServiceChunk).where(ServiceChunk.service_record_id.in_(sr_ids))
+    )
+    if chunk_rows:
+        db.session.execute(insert(ServiceChunk), chunk_rows)
+
+    checklist_rows = []
+    for sr_id, parts, _ in results:
+        values = {"text": " ".join(text for _, text in parts)}
+
+        service = {"service_id": None, "service_detected": None, "confidence": None}
+        detection = detect(parts)
+        if detection:
+            service_key, label, confidence, _ = detection
+            service_id = SERVICE_KEY_MAP.get(service_key)
+            if service_id:
+                service = {"service_id": service_id, "service_detected": label, "confidence": confidence}
+
+        old_service_id = sessions[sr_id].service_id
+        if service["service_id"] != old_service_id:
+            print(f"[RETRANSCRIBE] SR={sr_id} service {old_service_id} -> {service['service_id']}")
+            values.update(service, is_normal_flow=False, reason=SERVICE_CHANGED_REASON)
+            db.session.execute(
+                delete(ServiceChecklist).where(ServiceChecklist.service_record_id == sr_id)
+            )
+            if service["service_id"]:
+                checklist_rows.extend(build_checklist_rows(sr_id, service["service_id"]))
+
+        db.session.execute(
+            update(ServiceRecord)
+            .where(ServiceRecord.service_record_id == sr_id)
+            .values(**values)
+        )
+
+    if checklist_rows:
+        db.session.execute(insert(ServiceChecklist), checklist_rows)
+
+    # service_id / is_normal_flow may have changed: the rollup is keyed by them
+    for day in sorted({sessions[sr_id].start_time.date() for sr_id in sr_ids}):
+        rebuild_rollup(day, day + timedelta(days=1))
+
+    db.session.commit()
+
+
+# =====================================
+# CHECKPOINT
+# =====================================
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def save_checkpoint(path, sr_ids):
+    with open(path, "a") as f:
+        for sr_id in sr_ids:
+            f.write(sr_id + "\n")
+
+
+# =====================================
+# MAIN
+# =====================================
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-transcribe archived sessions")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="start_time >= (YYYY-MM-DD)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="start_time < (YYYY-MM-DD)")
+    parser.add_argument("--sr", nargs="+", help="only these service_record_ids")
+    parser.add_argument("--workers", type=int, default=Config.STT_WORKERS)
+    parser.add_argument("--batch", type=int, default=20, help="sessions per DB transaction")
+    parser.add_argument("--window", type=float, default=30.0, help="seconds of audio per decode")
+    parser.add_argument("--overlap", type=float, default=5.0, help="seconds shared by consecutive windows")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="ignore and clear the checkpoint")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Bare app: no MQTT / ingestor in the batch job
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    done = load_checkpoint(args.checkpoint)
+
+    with app.app_context():
+        query = (
+            db.session.query(
+                ServiceRecord.service_record_id,
+                ServiceRecord.audio_path,
+                ServiceRecord.start_time,
+                ServiceRecord.service_id
+            )
+            .filter(ServiceRecord.end_time.isnot(None))
+            .filter(ServiceRecord.audio_path.isnot(None))
+        )
+        if args.since:
+            query = query.filter(ServiceRecord.start_time >= args.since)
+        if args.until:
+            query = query.filter(ServiceRecord.start_time < args.until)
+        if args.sr:
+            query = query.filter(ServiceRecord.service_record_id.in_(args.sr))
+
+        sessions = [
+            row for row in query.order_by(
+                ServiceRecord.start_time,
+                id_number(ServiceRecord.service_record_id)
+            ).all()
+            if row.service_record_id not in done and os.path.isdir(row.audio_path)
+        ]
+        by_id = {row.service_record_id: row for row in sessions}
+
+        print(
+            f"[RETRANSCRIBE] {len(sessions)} session(s) to process "
+            f"({len(done)} already done), {args.workers} worker(s)"
+        )
+        if not sessions:
+            return
+
+        t0 = time.monotonic()
+        total_audio = 0.0
+        processed = 0
+        batch = []
+
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(
+                    transcribe_session, row.service_record_id, row.audio_path, args.window, args.overlap
+                ):
+                    row.service_record_id
+                for row in sessions
+            }
+
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Not checkpointed: retried on the next run
+                    print(f"[RETRANSCRIBE] SR={futures[future]} failed:", e)
+                    continue
+
+                batch.append(result)
+                total_audio += result[2]
+
+                if len(batch) >= args.batch:
+                    write_batch(batch, by_id)
+                    save_checkpoint(args.checkpoint, [r[0] for r in batch])
+                    processed += len(batch)
+                    batch = []
+
+                    elapsed = time.monotonic() - t0
+                    print(
+                        f"[RETRANSCRIBE] {processed}/{len(sessions)} sessions, "
+                        f"{total_audio:.0f} audio-s in {elapsed:.0f}s "
+                        f"({total_audio / elapsed:.2f} audio-s per wall-s)"
+                    )
+
+            if batch:
+                write_batch(batch, by_id)
+                save_checkpoint(args.checkpoint, [r[0] for r in batch])
+                processed += len(batch)
+
+        elapsed = time.monotonic() - t0
+        print(
+            f"[RETRANSCRIBE] done: {processed} sessions, {total_audio:.0f} audio-s "
+            f"in {elapsed:.0f}s ({total_audio / elapsed if elapsed else 0:.2f} audio-s per wall-s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
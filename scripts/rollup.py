@@ -0,0 +1,37 @@
+# scripts/rollup.py
+#
+# Rebuild the daily_compliance rollup from service_records.
+#   python -m scripts.rollup                               whole history
+#   python -m scripts.rollup --since 2025-12-01 --until 2026-01-01
+# Run after migration 002 (scripts.retranscribe keeps the days it
+# rewrites up to date itself).
+import argparse
+from datetime import date
+
+from flask import Flask
+
+from app.config import Config
+from app.extensions import db
+from app.services.compliance_rollup import rebuild_rollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild daily_compliance")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="day after the last (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    # Bare app: no MQTT / ingestor
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        rows = rebuild_rollup(args.since, args.until)
+        db.session.commit()
+
+    print(f"[ROLLUP] rebuilt {rows} row(s) since={args.since} until={args.until}")
+
+
+if __name__ == "__main__":
+    main()
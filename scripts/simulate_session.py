@@ -1,13 +1,22 @@
+# scripts/simulate_session.py
+#
+#   python -m scripts.simulate_session
+
 import os
 import time
 import json
 import base64
+import io
 import tempfile
 from datetime import datetime, timezone
 
+import numpy as np
+import soundfile as sf
 from pydub import AudioSegment
 from paho.mqtt import client as mqtt_client
 
+from app.services.audio_frame import encode_audio_frame
+
 # ======================================
 # CONFIG (FINAL CONTRACT)
 # ======================================
@@ -26,6 +35,20 @@ TOPIC_AUDIO     = f"rp/{RP_ID}/audio/stream"
 
 CHUNK_MS = 3000
 PUBLISH_DELAY = 0.5
+SAMPLE_RATE = 16000
+AUDIO_FORMAT = os.getenv("SIM_AUDIO_FORMAT", "pcm_s16le")  # or "flac"
+
+
+def audio_frame(chunk_number, chunk):
+    pcm = chunk.set_frame_rate(SAMPLE_RATE).set_channels(1).set_sample_width(2).raw_data
+
+    if AUDIO_FORMAT == "flac":
+        buf = io.BytesIO()
+        sf.write(buf, np.frombuffer(pcm, dtype=np.int16), SAMPLE_RATE, format="FLAC")
+        pcm = buf.getvalue()
+
+    return encode_audio_frame(chunk_number, SAMPLE_RATE, AUDIO_FORMAT, pcm)
+
 
 def on_connect(client, userdata, flags, rc):
     print(f"[MQTT] Connected rc={rc}")
@@ -75,25 +98,9 @@ client.publish(
 time.sleep(1)
 
 for idx, chunk in enumerate(chunks[1:], start=2):
-    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-        chunk.export(tmp.name, format="mp3")
-        tmp_path = tmp.name
-
-    with open(tmp_path, "rb") as f:
-        audio_bytes = f.read()
-
-    os.remove(tmp_path)
-
-    payload = {
-        "rp_id": RP_ID,
-        "chunk_number": idx,
-        "audio": base64.b64encode(audio_bytes).decode(),
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
-
     client.publish(
         TOPIC_AUDIO,
-        payload=json.dumps(payload),
+        payload=audio_frame(idx, chunk),
         qos=0
     )
 
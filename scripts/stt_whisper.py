@@ -1,6 +1,5 @@
 # app/services/stt_whisper.py
-from app.services.whisper_model import get_whisper_model
-import whisper
+from app.services.whisper_model import get_stt_backend
 import librosa
 import numpy as np
 import sounddevice as sd
@@ -18,33 +17,53 @@ def _ensure_16k(file_path):
     )
     return audio.astype(np.float32)
 
+def pcm_to_16k(pcm, sample_rate=TARGET_SR):
+    """
+    Convert an in-memory PCM buffer (int16 or float32) to 16kHz float32.
+    Resampling only happens when sample_rate is not already 16kHz.
+    """
+    audio = np.asarray(pcm)
+    if audio.dtype == np.int16:
+        audio = audio.astype(np.float32) / 32768.0
+    else:
+        audio = audio.astype(np.float32, copy=False)
+
+    if sample_rate != TARGET_SR:
+        audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=TARGET_SR)
+    return audio
+
 def transcribe(file_path, language="id"):
-    model = get_whisper_model()
+    """
+    Transcribe an audio file with the configured STT backend.
+    Returns {"text", "language"} (same keys as whisper's result).
+    """
     audio = _ensure_16k(file_path)
-
-    result = model.transcribe(
-        audio,
-        language=language,
-        verbose=False
-    )
-    return result
+    text = transcribe_pcm(audio, sample_rate=TARGET_SR, language=language)
+    return {"text": text, "language": language}
 
 
 def transcribe_chunk(audio_file, language="id", initial_prompt=None):
-    model = get_whisper_model()
     audio = _ensure_16k(audio_file)
+    return transcribe_pcm(
+        audio,
+        sample_rate=TARGET_SR,
+        language=language,
+        initial_prompt=initial_prompt
+    )
 
-    kwargs = {
-        "language": language,
-        "verbose": False,
-        "temperature": 0.0,
-    }
 
-    if initial_prompt:
-        kwargs["initial_prompt"] = initial_prompt
+def transcribe_pcm(pcm, sample_rate=TARGET_SR, language="id", initial_prompt=None):
+    """
+    Transcribe a PCM buffer directly (no temp file, no reload).
+    """
+    backend = get_stt_backend()
+    audio = pcm_to_16k(pcm, sample_rate)
 
-    result = model.transcribe(audio, **kwargs)
-    return result.get("text", "").strip()
+    return backend.transcribe(
+        audio,
+        language=language,
+        initial_prompt=initial_prompt
+    )
 
 
 def record_audio(duration=5, fs=16000):